@@ -3,6 +3,20 @@ import shutil
 import os
 from datetime import datetime
 import json
+from tracing import traced
+from analytics import create_analytics_tables, ensure_analytics, refresh_project_summaries
+from search import create_search_index, ensure_search_index, index_interaction
+from transcripts import create_transcript_store, ensure_transcript_store, store_transcript
+from dedup import create_dedup_tables, ensure_dedup_tables
+
+# Optional dedup.DuplicateIndex used to catch rephrased requirements and constraints
+duplicate_index = None
+
+# Rows inserted by the helpers into their base tables, reported per helper in the traces
+rows_written = 0
+
+# When True the helpers leave committing to the caller, so a writer can group payloads in one transaction
+defer_commits = False
 
 
 def create_database():
@@ -84,7 +98,9 @@ def create_database():
         SourceTypeID INTEGER,
         RawText VARCHAR,
         ExtractedSummary VARCHAR,
-        FOREIGN KEY (SourceTypeID) REFERENCES SourceType(SourceTypeID)
+        RawTextHash CHAR(64),
+        FOREIGN KEY (SourceTypeID) REFERENCES SourceType(SourceTypeID),
+        FOREIGN KEY (RawTextHash) REFERENCES TranscriptBlob(Hash)
     )
     ''')  
 
@@ -173,11 +189,54 @@ def create_database():
     ]
     cursor.executemany('INSERT INTO ConstraintType (ConstraintTypeName) VALUES (?)', constraint_types)
 
+    # Create the portfolio summary tables
+    create_analytics_tables(cursor)
+
+    # Create the compressed transcript store
+    create_transcript_store(cursor)
+
+    # Create the full-text search index and its sync triggers
+    create_search_index(cursor)
+
+    # Create the tables backing near-duplicate detection
+    create_dedup_tables(cursor)
+
     conn.commit()
     conn.close()
 
+  # Older databases get the summary tables and search index created and backfilled once
+  ensure_analytics()
+  ensure_transcript_store()
+  ensure_search_index()
+  ensure_dedup_tables()
+
+
+def commit():
+  if not defer_commits:
+    conn.commit()
 
-def check_missing_fields(tabel_name,data):
+def count_rows():
+  # counts the row of the helper's own INSERT; conn.total_changes would also count trigger,
+  # FTS shadow-table and embedding writes
+  global rows_written
+  rows_written += max(cursor.rowcount, 0)
+
+def find_near_duplicate(table, ProjectID, description):
+  # returns ((RowID, similarity) or None, embedding of the description)
+  if duplicate_index is None:
+    return None, None
+  return duplicate_index.find_duplicate(cursor, table, ProjectID, description)
+
+def remember_description(table, ProjectID, RowID, vector, duplicate):
+  if duplicate_index is None:
+    return
+  duplicate_index.add(cursor, table, ProjectID, RowID, vector)
+  if duplicate:
+    cursor.execute("INSERT OR REPLACE INTO DuplicateCandidates (Kind, RowID, DuplicateOfID, Similarity) VALUES (?, ?, ?, ?)",
+                   (table, RowID, duplicate[0], duplicate[1]))
+    duplicate_index.events.append((table, RowID, duplicate[0], duplicate[1]))
+
+def check_missing_fields(tabel_name,data,derived=()):
 
   # gets column from specific table
   query = f"PRAGMA table_info({tabel_name})"
@@ -188,6 +247,9 @@ def check_missing_fields(tabel_name,data):
   try:
     for EachColumn in range(1,len(columns)):
       column = columns[EachColumn]
+      # columns filled in by the helpers themselves are not part of the payload
+      if column[1] in derived:
+        continue
 
       essential_fields[column[1]] = data[column[1]]
 
@@ -203,6 +265,7 @@ def check_missing_fields(tabel_name,data):
   except Exception as e:
     return(f"Unexpected error: {e}")
 
+@traced("db.add_client", rows=lambda: rows_written)
 def add_client(data):
 
   essential_fields = check_missing_fields('Clients',data)
@@ -216,14 +279,16 @@ def add_client(data):
         essential_fields['IndustryID'] = result[0]
   else:
     cursor.execute("INSERT INTO Industry (IndustryName) VALUES (?)", (essential_fields['IndustryID'],))
-    conn.commit()
+    count_rows()
+    commit()
     essential_fields['IndustryID'] = cursor.lastrowid
 
   try:
     cursor.execute("INSERT INTO Clients (ClientName, ContactEmail, ContactNumber, Location, IndustryID) VALUES (?, ?, ?, ?, ?)",
                   (essential_fields['ClientName'], essential_fields['ContactEmail'], essential_fields['ContactNumber'],
                     essential_fields['Location'], essential_fields['IndustryID']))
-    conn.commit()
+    count_rows()
+    commit()
     ClientID = cursor.lastrowid
     return ClientID
 
@@ -236,6 +301,7 @@ def add_client(data):
     else:
       return(f"Error: {e}")
 
+@traced("db.add_project", rows=lambda: rows_written)
 def add_project(data, Client_ID):
   data['ClientID'] = Client_ID
   essential_fields = check_missing_fields('Project',data)
@@ -273,12 +339,14 @@ def add_project(data, Client_ID):
                   (essential_fields['ProjectName'], essential_fields['StartDate'], essential_fields['EndDate'],
                     essential_fields['NumUsers'], essential_fields['ProjectStatus'], essential_fields['Budget'],
                     essential_fields['DeliveryModel'], essential_fields['ClientID']))
-    conn.commit()
+    count_rows()
+    commit()
     ProjectID = cursor.lastrowid
     return ProjectID
   except sqlite3.Error as e:
     return(f"Error: {e}")
   
+@traced("db.add_project_technology", rows=lambda: rows_written)
 def add_project_technology(data,ProjectID):
     for each in data:
       essential_fields = check_missing_fields('TechnologyStack',each)
@@ -294,13 +362,15 @@ def add_project_technology(data,ProjectID):
       else:
         cursor.execute("INSERT INTO TechnologyStack (TechName,Category) VALUES (?,?)",
          (essential_fields['TechName'],essential_fields['Category']))
-        conn.commit()
+        count_rows()
+        commit()
         essential_fields['TechName'] = cursor.lastrowid
 
       try:
           cursor.execute("INSERT INTO ProjectTechnology (ProjectID, TechID, Status) VALUES (?, ?, ?)",
                         (ProjectID, essential_fields['TechName'], each['Status']))
-          conn.commit()
+          count_rows()
+          commit()
 
       except sqlite3.Error as e:
         if str(e) == "UNIQUE constraint failed: ProjectTechnology.ProjectID, ProjectTechnology.TechID":
@@ -309,9 +379,10 @@ def add_project_technology(data,ProjectID):
           return(f"Error: {e}")
     return True
 
+@traced("db.add_interaction_log", rows=lambda: rows_written)
 def add_Interaction_Log(data):
 
-  essential_fields = check_missing_fields('InteractionLog',data)
+  essential_fields = check_missing_fields('InteractionLog',data,derived=('RawTextHash',))
   if isinstance(essential_fields, str):
     return essential_fields
   #
@@ -323,7 +394,8 @@ def add_Interaction_Log(data):
       essential_fields['SourceTypeID'] = result[0]
   else:
     cursor.execute("INSERT INTO SourceType (SourceTypeName) VALUES (?)", (essential_fields['SourceTypeID'],))
-    conn.commit()
+    count_rows()
+    commit()
     essential_fields['SourceTypeID'] = cursor.lastrowid
 
   #
@@ -335,8 +407,11 @@ def add_Interaction_Log(data):
 
 
   try:
-    cursor.execute("SELECT InteractionID FROM InteractionLog WHERE Timestamp = ? AND SourceTypeID = ? AND RawText = ? AND ExtractedSummary = ?",
-                  (essential_fields['Timestamp'], essential_fields['SourceTypeID'], essential_fields['RawText'],
+    # transcripts are stored once, compressed, and referenced by hash
+    RawTextHash = store_transcript(cursor, essential_fields['RawText'])
+
+    cursor.execute("SELECT InteractionID FROM InteractionLog WHERE Timestamp = ? AND SourceTypeID = ? AND RawTextHash = ? AND ExtractedSummary = ?",
+                  (essential_fields['Timestamp'], essential_fields['SourceTypeID'], RawTextHash,
                     essential_fields['ExtractedSummary']))
     result = cursor.fetchone()
 
@@ -344,16 +419,19 @@ def add_Interaction_Log(data):
       InteractionID = result[0]
       return InteractionID
     else:
-      cursor.execute("INSERT INTO InteractionLog (Timestamp, SourceTypeID, RawText, ExtractedSummary) VALUES (?, ?, ?, ?)",
-                    (essential_fields['Timestamp'], essential_fields['SourceTypeID'], essential_fields['RawText'],
+      cursor.execute("INSERT INTO InteractionLog (Timestamp, SourceTypeID, RawTextHash, ExtractedSummary) VALUES (?, ?, ?, ?)",
+                    (essential_fields['Timestamp'], essential_fields['SourceTypeID'], RawTextHash,
                       essential_fields['ExtractedSummary']))
-    conn.commit()
-    InteractionID = cursor.lastrowid
+      count_rows()
+      InteractionID = cursor.lastrowid
+      index_interaction(cursor, InteractionID, essential_fields['RawText'], essential_fields['ExtractedSummary'])
+    commit()
     return InteractionID
 
   except sqlite3.Error as e:
     return(f"Error: {e}")
 
+@traced("db.add_requirements", rows=lambda: rows_written)
 def add_Requirements(data,ProjectID):
   for each in data:
     each['ProjectID'] = ProjectID
@@ -371,7 +449,8 @@ def add_Requirements(data,ProjectID):
     else:
       cursor.execute("INSERT INTO RequirementCategories (RequirementCategoryName) VALUES (?)",
                      (essential_fields['RequirementCategoryID'],))
-      conn.commit()
+      count_rows()
+      commit()
       essential_fields['RequirementCategoryID'] = cursor.lastrowid
 
     SourceID = add_Interaction_Log(essential_fields["InteractionID"])
@@ -405,16 +484,24 @@ def add_Requirements(data,ProjectID):
       if result:
         print("Requirements details already in database. \n")
       else:
-        cursor.execute("INSERT INTO Requirements (ProjectID, InteractionID, Type, Description, Status, PriorityType, RequirementCategoryID) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                        (essential_fields['ProjectID'], essential_fields['InteractionID'], essential_fields['Type'],
-                          essential_fields['Description'], essential_fields['Status'], essential_fields['PriorityType'],
-                          essential_fields['RequirementCategoryID']))
-        conn.commit()
+        duplicate, vector = find_near_duplicate('Requirements', essential_fields['ProjectID'], essential_fields['Description'])
+        if duplicate and duplicate_index.mode == "merge":
+          print(f"Requirement merged into near-duplicate {duplicate[0]} ({duplicate[1]:.2f}). \n")
+          duplicate_index.events.append(('Requirements', None, duplicate[0], duplicate[1]))
+        else:
+          cursor.execute("INSERT INTO Requirements (ProjectID, InteractionID, Type, Description, Status, PriorityType, RequirementCategoryID) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                          (essential_fields['ProjectID'], essential_fields['InteractionID'], essential_fields['Type'],
+                            essential_fields['Description'], essential_fields['Status'], essential_fields['PriorityType'],
+                            essential_fields['RequirementCategoryID']))
+          count_rows()
+          remember_description('Requirements', essential_fields['ProjectID'], cursor.lastrowid, vector, duplicate)
+          commit()
 
     except sqlite3.Error as e:
       return(f"Error: {e}")
   return True
 
+@traced("db.add_constraints", rows=lambda: rows_written)
 def add_Constraints(data,ProjectID):
   for each in data:
     each['ProjectID'] = ProjectID
@@ -432,7 +519,8 @@ def add_Constraints(data,ProjectID):
     else:
       cursor.execute("INSERT INTO ConstraintType (ConstraintTypeName) VALUES (?)",
                      (essential_fields['ConstraintTypeID'],))
-      conn.commit()
+      count_rows()
+      commit()
       essential_fields['ConstraintTypeID'] = cursor.lastrowid
 
     SourceID = add_Interaction_Log(essential_fields["InteractionID"])
@@ -452,45 +540,71 @@ def add_Constraints(data,ProjectID):
       if result:
         print("Constraint details already in database. \n")
       else:
-        cursor.execute("INSERT INTO Constraints (ProjectID, InteractionID, ConstraintTypeID, Description, Severity) VALUES (?, ?, ?, ?, ?)",
-                        (essential_fields['ProjectID'], essential_fields['InteractionID'], essential_fields['ConstraintTypeID'],
-                          essential_fields['Description'], essential_fields['Severity']))
-        conn.commit()
+        duplicate, vector = find_near_duplicate('Constraints', essential_fields['ProjectID'], essential_fields['Description'])
+        if duplicate and duplicate_index.mode == "merge":
+          print(f"Constraint merged into near-duplicate {duplicate[0]} ({duplicate[1]:.2f}). \n")
+          duplicate_index.events.append(('Constraints', None, duplicate[0], duplicate[1]))
+        else:
+          cursor.execute("INSERT INTO Constraints (ProjectID, InteractionID, ConstraintTypeID, Description, Severity) VALUES (?, ?, ?, ?, ?)",
+                          (essential_fields['ProjectID'], essential_fields['InteractionID'], essential_fields['ConstraintTypeID'],
+                            essential_fields['Description'], essential_fields['Severity']))
+          count_rows()
+          remember_description('Constraints', essential_fields['ProjectID'], cursor.lastrowid, vector, duplicate)
+          commit()
 
     except sqlite3.Error as e:
       return(f"Error: {e}")
   return True
 
-def main(data: dict):
+@traced("db.save")
+def save(data: dict, connection, near_duplicates=None):
 
-  global conn, cursor
-  # Connect to the SQLite database
-  database_path = 'my_DB.db'
-  conn = sqlite3.connect(database_path)
+  global conn, cursor, duplicate_index
+  conn = connection
   cursor = conn.cursor()
+  duplicate_index = near_duplicates
+  if duplicate_index is not None:
+    duplicate_index.events = []
+  ProjectID = None
 
-  ClientID = add_client(data['Clients'])
-  if isinstance(ClientID, str):
-    return ClientID
-  
-  ProjectID = add_project(data['Project'], ClientID)
-  if isinstance(ProjectID, str):
-    return ProjectID
-  
-  tech_stack = add_project_technology(data['ProjectTechnology'], ProjectID)
-  if isinstance(tech_stack, str):
-    return tech_stack
-  
-  requirements = add_Requirements(data['Requirements'], ProjectID)
-  if isinstance(requirements, str):
-    return requirements       
-  
-  constraints = add_Constraints(data['Constraints'], ProjectID)
-  if isinstance(constraints, str):
-    return constraints    
+  try:
+    ClientID = add_client(data['Clients'])
+    if isinstance(ClientID, str):
+      return ClientID
     
-  conn.close()
-  return True
+    ProjectID = add_project(data['Project'], ClientID)
+    if isinstance(ProjectID, str):
+      return ProjectID
+    
+    tech_stack = add_project_technology(data['ProjectTechnology'], ProjectID)
+    if isinstance(tech_stack, str):
+      return tech_stack
+    
+    requirements = add_Requirements(data['Requirements'], ProjectID)
+    if isinstance(requirements, str):
+      return requirements       
+    
+    constraints = add_Constraints(data['Constraints'], ProjectID)
+    if isinstance(constraints, str):
+      return constraints    
+
+    return True
+
+  finally:
+    # Rows committed so far are reflected in the summaries, even on a partial save
+    if isinstance(ProjectID, int):
+      refresh_project_summaries(cursor, ProjectID)
+      commit()
+
+def main(data: dict, near_duplicates=None):
+
+  # Connect to the SQLite database
+  database_path = 'my_DB.db'
+  connection = sqlite3.connect(database_path)
+  try:
+    return save(data, connection, near_duplicates)
+  finally:
+    connection.close()
 
 
 
@@ -2,17 +2,27 @@ import streamlit as st
 import os
 import json
 import re
+import uuid
 from typing import List, TypedDict, Dict, Any
 from langchain_core.documents import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_community.document_loaders import UnstructuredWordDocumentLoader
 from langgraph.graph import START, StateGraph
-from langchain_core.messages import HumanMessage
 from langchain.schema import SystemMessage
-from Rag_to_DB import create_database,main as Rag_to_DB 
+from Rag_to_DB import create_database
+from tracing import trace_stage, token_usage, latency_summary, start_metrics_server
+import analytics
+import search
+from dedup import DuplicateIndex, DUPLICATE_THRESHOLD, DUPLICATE_MODE
+from db_writer import DBWriter
+from session_store import SQLiteSessionStore
+from prompt_cache import create_prompt_cache, estimate_tokens
+from rate_limit import RateLimiter, INTERACTIVE, BACKGROUND
+from ingest import ingest
+from shared_index import SharedIndex, publish, claim_build, release_build, wait_for_generation, current_generation
+from project_loader import load_project
+from pre_extract import pre_extract, load_matchers, drop_filled, merge_into
+from kb_namespaces import NamespaceStore, session_route
 
 # Page configuration
 st.set_page_config(page_title="RAG-Powered Trackbot", page_icon="🤖", layout="wide")
@@ -38,64 +48,226 @@ Project_Inception_Brief = SystemMessage(content=load_txt("Project_Inception_Brie
 @st.cache_resource
 def initialize_rag_components():
     """Initialize RAG components once and cache them."""
+    building = False
+    shared_dir = None
     try:
         # Initialize embeddings
         embedding_model = HuggingFaceEmbeddings(model_name="all-mpnet-base-v2")
         
+        params = {"ef_search": st.secrets.get("KB_EF_SEARCH"), "nprobe": st.secrets.get("KB_NPROBE")}
+        shared_dir = st.secrets.get("KB_SHARED_INDEX_DIR")
+        if shared_dir:
+            # Worker processes share one memory-mapped copy of the published index
+            # and switch to new generations as they are published
+            shared = SharedIndex(embedding_model, shared_dir, params)
+            if shared.current() is None:
+                # Only one starting worker builds the first generation; the others wait
+                # and map it instead of each building their own copy in RAM
+                building = claim_build(shared_dir)
+                if building and current_generation(shared_dir):
+                    # Published by another worker just before we took the lock
+                    release_build(shared_dir)
+                    building = False
+                if not building:
+                    wait_for_generation(shared_dir)
+            if not building and shared.current(force=True) is not None:
+                return embedding_model, shared
+
         # Load knowledge base document
         knowledge_base_path = "knowledge base.docx"
         if not os.path.exists(knowledge_base_path):
             st.error(f"Knowledge base file '{knowledge_base_path}' not found!")
             return None, None
         
-        # Load and process the knowledge base document
-        loader = UnstructuredWordDocumentLoader(knowledge_base_path)
-        docs = loader.load()
-        
-        # Split into chunks
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        all_splits = text_splitter.split_documents(docs)
-        
-        # Create FAISS vector store from documents
-        vector_store = FAISS.from_documents(all_splits, embedding_model)
+        # Parse, split and embed the knowledge base (in parallel when KB_INGEST_WORKERS > 1);
+        # index type and search parameters from secrets
+        vector_store, stats = ingest(
+            [knowledge_base_path], embedding_model,
+            index_type=st.secrets.get("KB_INDEX_TYPE", "Flat"),
+            params=params,
+            workers=int(st.secrets.get("KB_INGEST_WORKERS", 1)),
+        )
+        print(f"Knowledge base: {stats['chunks']} chunks in {stats['seconds']}s ({stats['chunks_per_second']} chunks/s)")
+
+        if shared_dir:
+            # First worker to start publishes the index for the others
+            publish(vector_store, shared_dir)
+            shared.current(force=True)
+            return embedding_model, shared
         
         return embedding_model, vector_store
     except Exception as e:
         st.error(f"Error initializing RAG components: {e}")
         return None, None
+    finally:
+        if building:
+            release_build(shared_dir)
+
+MODEL_NAME = "gemini-2.0-flash"
 
 @st.cache_resource
 def load_llm():
     """Load and cache the Gemini LLM."""
     try:
         return ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",
+            model=MODEL_NAME,
             google_api_key=st.secrets["GOOGLE_API_KEY"],
-            convert_system_message_to_human=True
+            convert_system_message_to_human=True,
+            max_retries=0  # retries are handled by the shared rate limiter
         )
     except Exception as e:
         st.error(f"Error loading LLM: {e}")
         return None
 
+@st.cache_resource
+def prepare_database():
+    """Create the database and run the one-time migrations (summaries, transcripts, search, dedup) once per process."""
+    create_database()
+    return True
+
+@st.cache_resource
+def load_kb_namespaces(_embedding_model):
+    """Per-industry / per-client knowledge bases, loaded on first use and shared across sessions."""
+    return NamespaceStore(
+        _embedding_model,
+        max_memory_mb=int(st.secrets.get("KB_NAMESPACE_MEMORY_MB", 512)),
+        index_type=st.secrets.get("KB_INDEX_TYPE", "Flat"),
+        params={"ef_search": st.secrets.get("KB_EF_SEARCH"), "nprobe": st.secrets.get("KB_NPROBE")},
+        workers=int(st.secrets.get("KB_INGEST_WORKERS", 1)),
+    )
+
+@st.cache_resource
+def load_duplicate_index(_embedding_model):
+    """Near-duplicate index over stored requirements/constraints, shared across sessions."""
+    return DuplicateIndex(
+        _embedding_model,
+        threshold=float(st.secrets.get("DUPLICATE_THRESHOLD", DUPLICATE_THRESHOLD)),
+        mode=st.secrets.get("DUPLICATE_MODE", DUPLICATE_MODE),
+    )
+
+@st.cache_resource
+def load_db_writer():
+    """Single background writer that owns the DB connection for all sessions."""
+    return DBWriter()
+
+@st.cache_resource
+def load_session_store():
+    """Server-side store keeping a bounded working set of the active sessions in memory."""
+    return SQLiteSessionStore(
+        max_sessions=int(st.secrets.get("SESSIONS_IN_MEMORY", 1000)),
+        idle_seconds=int(st.secrets.get("SESSION_IDLE_MINUTES", 30)) * 60,
+        max_memory_mb=int(st.secrets.get("SESSION_MEMORY_MB", 256)),
+    )
+
+# Session state that is saved with the session and restored after a restart
+PERSISTED_KEYS = ["extracted_data", "missing_fields", "clarification_questions",
+                  "current_question_index", "asking_clarification", "extraction_done"]
+
+def persist_session():
+    load_session_store().save_state(st.session_state.session_id,
+                                    {key: st.session_state[key] for key in PERSISTED_KEYS})
+
+def remember_message(channel, message):
+    """Append a chat message to the session store (which trims the in-memory history)."""
+    load_session_store().append_message(st.session_state.session_id, channel, message)
+    persist_session()
+
+def current_namespace(namespaces):
+    """KB namespace for this session: the extracted client's, else its industry's (None for the global KB)."""
+    return namespaces.resolve(session_route(st.session_state.extracted_data))
+
+@st.cache_resource
+def start_metrics_endpoint():
+    """Expose Prometheus metrics locally when METRICS_PORT is set in secrets."""
+    port = st.secrets.get("METRICS_PORT")
+    if port:
+        try:
+            return start_metrics_server(int(port))
+        except OSError as e:
+            print(f"Could not start metrics endpoint: {e}")
+    return None
+
+@st.cache_resource
+def load_prompt_cache():
+    """Cache for the static prompt prefixes, shared by all sessions."""
+    return create_prompt_cache(st.secrets.get("GOOGLE_API_KEY"), MODEL_NAME)
+
+@st.cache_resource
+def load_rate_limiter():
+    """Request/token quota, concurrency cap and retries shared by every LLM call of every session."""
+    return RateLimiter(
+        requests_per_minute=int(st.secrets.get("LLM_REQUESTS_PER_MINUTE", 15)),
+        tokens_per_minute=int(st.secrets.get("LLM_TOKENS_PER_MINUTE", 1000000)),
+        max_concurrent=int(st.secrets.get("LLM_MAX_CONCURRENT", 4)),
+    )
+
+# Response tokens reserved per call until the actual usage is known
+EXPECTED_RESPONSE_TOKENS = 1024
+
+def invoke_llm(llm, prefix, suffix, stage, priority=INTERACTIVE):
+    """Invoke the LLM on a static prompt prefix plus a variable suffix.
+
+    The call waits for the shared rate limiter (interactive calls ahead of
+    background document generation) and quota errors are retried with
+    backoff. The prefix goes through the prompt cache; latency, queue time and
+    cached vs. uncached prompt tokens are traced.
+    """
+    with trace_stage(stage) as span:
+        response, cached_tokens = load_rate_limiter().call(
+            lambda: load_prompt_cache().invoke(llm, prefix, suffix),
+            tokens=estimate_tokens(prefix + suffix) + EXPECTED_RESPONSE_TOKENS,
+            priority=priority,
+            usage=lambda result: sum(count or 0 for count in token_usage(result[0])) or None,
+            span=span,
+        )
+        span["prompt_tokens"], span["response_tokens"] = token_usage(response)
+        span["cached_tokens"] = cached_tokens
+        if span["prompt_tokens"] is not None:
+            span["uncached_tokens"] = max(0, span["prompt_tokens"] - cached_tokens)
+        span["prompt_chars"] = len(prefix) + len(suffix)
+    return response
+
 # Define RAG State
 class State(TypedDict):
     question: str
+    namespace: str
+    pre_extracted: Dict[str, Any]
     context: List[Document]
     answer: str
     extracted_data: Dict[str, Any]
     missing_fields: List[str]
     clarification_questions: List[str]
 
-def setup_rag_pipeline(vector_store, llm):
+def setup_rag_pipeline(vector_store, llm, namespaces=None):
     """Set up the RAG pipeline using LangGraph."""
     
+    def pre_extract_fields(state: State):
+        """Read the fields that can be matched exactly (emails, dates, lookup names) from the dump."""
+        if not state.get("question"):
+            return {"pre_extracted": {}}
+        with trace_stage("parse.pre_extract") as span:
+            found = pre_extract(state["question"], load_matchers())
+            span["fields"] = sorted(field for section in found.values() if isinstance(section, dict) for field in section)
+        return {"pre_extracted": found}
+
     def retrieve(state: State):
-        """Retrieve relevant documents from vector store."""
-        if not vector_store or not state.get("question"):
+        """Retrieve relevant documents from the session's namespace, or the global vector store."""
+        store = vector_store
+        namespace = state.get("namespace")
+        if namespaces and not namespace:
+            # A client or industry named in this dump can pick the namespace before anything is extracted
+            namespace = namespaces.resolve(session_route(state.get("pre_extracted")))
+        if namespaces and namespace:
+            store = namespaces.get(namespace) or vector_store
+        if not store or not state.get("question"):
             return {"context": []}
         
         try:
-            retrieved_docs = vector_store.similarity_search(state["question"], k=3)
+            with trace_stage("rag.embed"):
+                query_vector = store.embeddings.embed_query(state["question"])
+            with trace_stage("rag.similarity_search", namespace=namespace if store is not vector_store else None) as span:
+                retrieved_docs = store.similarity_search_by_vector(query_vector, k=3)
+                span["chunk_ids"] = [doc.id for doc in retrieved_docs]
             return {"context": retrieved_docs}
         except Exception as e:
             st.error(f"Error in retrieval: {e}")
@@ -111,26 +283,37 @@ def setup_rag_pipeline(vector_store, llm):
             docs_content = "\n\n".join(doc.page_content for doc in state.get("context", []))
 
             # Create specialized prompt for communication analysis
+            # The instructions are a static, cacheable prefix; context and dump vary per call
+            prefix = f""" {input_instruction.content} """
             if docs_content:
-                prompt_text = f""" {input_instruction.content} 
+                suffix = f"""
                 Knowledge Base  (use this to understand what data is needed):
                 {docs_content}
 
                 Communication Dump to Analyze:
                 {state["question"]}"""
             else:
-                prompt_text = f""" {input_instruction.content} 
+                suffix = f"""
                 Communication Dump to Analyze:
                 {state["question"]}"""
-
+            pre_extracted = state.get("pre_extracted") or {}
+            if pre_extracted:
+                suffix = f"""
+                Values already read from the dump (exact matches; use them as they are and do not ask about them):
+                {json.dumps(pre_extracted)}
+                """ + suffix
 
             # Get response from LLM
-            response = llm.invoke([HumanMessage(content=prompt_text)])
+            response = invoke_llm(llm, prefix, suffix, "llm.extract")
             
             # Extract structured information from response
-            extracted_data = extract_structured_data(response.content)
-            missing_fields = extract_missing_fields(response.content)
-            clarification_questions = extract_clarification_questions(response.content)
+            with trace_stage("parse.response"):
+                extracted_data = extract_structured_data(response.content)
+                missing_fields = extract_missing_fields(response.content)
+                clarification_questions = extract_clarification_questions(response.content)
+                # Pre-extracted values fill gaps; free-form questions are left to the LLM
+                extracted_data = merge_into(extracted_data, pre_extracted)
+                missing_fields = drop_filled(missing_fields, pre_extracted)
             
             return {
                 "answer": response.content,
@@ -149,8 +332,17 @@ def setup_rag_pipeline(vector_store, llm):
 
     # Build RAG graph
     try:
-        graph_builder = StateGraph(State).add_sequence([retrieve, generate])
-        graph_builder.add_edge(START, "retrieve")
+        def traced_node(name, node):
+            def run(state: State):
+                with trace_stage(f"node.{name}"):
+                    return node(state)
+            run.__name__ = name
+            return run
+
+        graph_builder = StateGraph(State).add_sequence([traced_node("pre_extract", pre_extract_fields),
+                                                         traced_node("retrieve", retrieve),
+                                                         traced_node("generate", generate)])
+        graph_builder.add_edge(START, "pre_extract")
         return graph_builder.compile()
     except Exception as e:
         st.error(f"Error building RAG pipeline: {e}")
@@ -202,6 +394,61 @@ def extract_clarification_questions(response_text: str) -> List[str]:
     
     return questions
 
+def render_analytics_view():
+    """Portfolio roll-ups read from the precomputed summary tables."""
+    st.markdown("### 📊 Portfolio analytics")
+    projects = analytics.list_projects()
+    options = [None] + [project["ProjectID"] for project in projects]
+    labels = {project["ProjectID"]: f"{project['ProjectName']} ({project['ClientName']})" for project in projects}
+    ProjectID = st.selectbox("Project", options, format_func=lambda option: "All projects" if option is None else labels[option])
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("##### Requirements by category and priority")
+        st.dataframe(analytics.requirements_by_category(ProjectID), hide_index=True, use_container_width=True)
+    with col2:
+        st.markdown("##### Constraints by type and severity")
+        st.dataframe(analytics.constraints_by_type(ProjectID), hide_index=True, use_container_width=True)
+
+    st.markdown("##### Technology adoption by industry")
+    st.dataframe(analytics.technology_by_industry(), hide_index=True, use_container_width=True)
+
+def render_search_view():
+    """Full-text search over past requirements, constraints and transcripts."""
+    st.markdown("### 🔎 Search past engagements")
+    text = st.text_input("Search", placeholder="e.g. salesforce dashboard")
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        ClientName = st.selectbox("Client", [None] + search.list_clients(),
+                                  format_func=lambda option: "All clients" if option is None else option)
+    with col2:
+        # Only the selected client's projects are offered
+        projects = [project for project in analytics.list_projects()
+                    if ClientName is None or project["ClientName"] == ClientName]
+        options = [None] + [project["ProjectID"] for project in projects]
+        labels = {project["ProjectID"]: f"{project['ProjectName']} ({project['ClientName']})" for project in projects}
+        ProjectID = st.selectbox("Project", options, format_func=lambda option: "All projects" if option is None else labels[option])
+    with col3:
+        kinds = st.multiselect("Search in", ["Requirement", "Constraint", "Interaction"],
+                               default=["Requirement", "Constraint", "Interaction"])
+    with col4:
+        dates = st.date_input("Interaction date range", value=())
+
+    date_from = dates[0].isoformat() if len(dates) > 0 else None
+    date_to = dates[1].isoformat() if len(dates) > 1 else None
+
+    if text:
+        with trace_stage("search.fts"):
+            results = search.search(text, ClientName=ClientName, ProjectID=ProjectID, date_from=date_from, date_to=date_to, kinds=kinds)
+        if not results:
+            st.info("No matches found.")
+        for result in results:
+            st.markdown(f"**{result['Kind']} #{result['ID']}** · {result['Project'] or '-'} · "
+                        f"{result['Client'] or '-'} · {result['Date'] or '-'}")
+            st.markdown(result["Snippet"])
+            st.markdown("---")
+
 
 def main():
     st.title("🤖 RAG-Powered Trackbot")
@@ -210,17 +457,15 @@ def main():
     # Initialize components
     embedding_model, vector_store = initialize_rag_components()
     llm = load_llm()
-    create_database()
+    prepare_database()
+    start_metrics_endpoint()
     
     if not embedding_model or not vector_store or not llm:
         st.error("Failed to initialize components. Please check your configuration and ensure 'knowledge base.docx' exists.")
         return
+    kb_namespaces = load_kb_namespaces(embedding_model)
     
     # Initialize session state for data tracking
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
-    if "additional_features_messages" not in st.session_state:
-        st.session_state.additional_features_messages = []
     if "extracted_data" not in st.session_state:
         st.session_state.extracted_data = {}
     if "missing_fields" not in st.session_state:
@@ -235,6 +480,25 @@ def main():
         st.session_state.extraction_done = False
     if "additional_features" not in st.session_state:
         st.session_state.additional_features = False
+    if "analytics_view" not in st.session_state:
+        st.session_state.analytics_view = False
+    if "search_view" not in st.session_state:
+        st.session_state.search_view = False
+    if "save_jobs" not in st.session_state:
+        st.session_state.save_jobs = []
+
+    # Attach this browser session to the server-side session store (the id lives in the URL)
+    store = load_session_store()
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = st.query_params.get("sid") or uuid.uuid4().hex
+        st.query_params["sid"] = st.session_state.session_id
+        # Rehydrate a session saved before a restart
+        for key, value in store.load_state(st.session_state.session_id).items():
+            st.session_state[key] = value
+    st.session_state.messages = store.recent_messages(st.session_state.session_id, "messages")
+    st.session_state.additional_features_messages = store.recent_messages(
+        st.session_state.session_id, "additional_features_messages")
+    persist_session()
 
     
     # Sidebar for information and settings
@@ -246,7 +510,26 @@ def main():
             st.success("✅ Knowledge base loaded successfully!")
         else:
             st.error("❌ Failed to load knowledge base")
-
+        namespace = current_namespace(kb_namespaces)
+        if namespace:
+            st.caption(f"📚 Knowledge base namespace: {namespace} "
+                       f"({len(kb_namespaces.loaded)} loaded, {kb_namespaces.memory_usage() / 2**20:.1f} MB)")
+
+        # Show how much memory this session holds and how much history lives on disk
+        spilled = store.spilled_count(st.session_state.session_id, "messages")
+        st.caption(f"🧠 Session memory: {store.memory_usage(st.session_state.session_id) / 1024:.1f} KB"
+                   + (f" · {spilled} older messages on disk" if spilled else ""))
+
+        # Show recent latency per pipeline stage
+        latencies = latency_summary()
+        if latencies:
+            with st.expander("⏱️ Stage latency"):
+                st.dataframe(
+                    [{"stage": stage, "runs": values["count"], "last (s)": round(values["last"], 3),
+                      "p50 (s)": round(values["p50"], 3), "p95 (s)": round(values["p95"], 3)}
+                     for stage, values in sorted(latencies.items())],
+                    hide_index=True,
+                )
         
 
 
@@ -279,21 +562,35 @@ def main():
             if st.button("📄 Save JSON To DB"):
                 if st.session_state.extracted_data :
                      with st.spinner("Generating JSON..."):
-                        prompt_text = f""" {Get_Json_prompt.content} {st.session_state.extracted_data}"""
-                        response = llm.invoke([HumanMessage(content=prompt_text)])
+                        response = invoke_llm(llm, f""" {Get_Json_prompt.content} """,
+                                              f"""{st.session_state.extracted_data}""", "llm.get_json")
                         response = response.content
                         response = response.replace("```json", "").replace("```", "")
                         response = json.loads(response)
-                        ans = Rag_to_DB(response)
-                        if isinstance(ans, bool):
-                            st.success("JSON generated and saved successfully!", icon="✅")
+                        job_id = load_db_writer().submit(response, load_duplicate_index(embedding_model))
+                        st.session_state.save_jobs.append(job_id)
+                        st.success(f"JSON generated and queued for saving (job {job_id}).", icon="✅")
+
+            # Status of the saves queued by this session
+            if st.session_state.save_jobs:
+                writer = load_db_writer()
+                with st.expander("💾 Save jobs", expanded=True):
+                    for job_id in st.session_state.save_jobs[-5:]:
+                        job = writer.status(job_id)
+                        if job["status"] == "saved":
+                            message = f"`{job_id}` saved"
+                            if job.get("duplicates"):
+                                action = "merged" if load_duplicate_index(embedding_model).mode == "merge" else "flagged"
+                                message += f" ({job['duplicates']} near-duplicate(s) {action})"
+                            st.success(message, icon="✅")
+                        elif job["status"] == "failed":
+                            st.error(f"`{job_id}` {job['result']}", icon="❌")
                         else:
-                            st.error(f"{ans}", icon="❌")
-                            
+                            st.info(f"`{job_id}` {job['status']}", icon="⏳")
+                    st.button("Refresh status")
+
 
  
-            if st.button("🔄 Usable documentation"):
-                st.session_state.additional_features = not st.session_state.additional_features
                                                                                                                         
         
             # Clear data button
@@ -303,11 +600,19 @@ def main():
                 st.session_state.clarification_questions = []
                 st.session_state.current_question_index = 0
                 st.session_state.asking_clarification = False
-                st.session_state.messages = []
+                store.clear(st.session_state.session_id, channels=["messages"])
 
                 st.success("All data and memory cleared!")
                 st.rerun()
         
+        st.markdown("---")
+        if st.button("🔄 Usable documentation"):
+            st.session_state.additional_features = not st.session_state.additional_features
+        if st.button("📊 Portfolio analytics"):
+            st.session_state.analytics_view = not st.session_state.analytics_view
+        if st.button("🔎 Search past engagements"):
+            st.session_state.search_view = not st.session_state.search_view
+
         st.markdown("---")
         st.markdown("### ℹ️ How it works")
         st.markdown("""
@@ -318,7 +623,13 @@ def main():
         5. Generate final JSON with all data
         """)
 
-    if st.session_state.additional_features:
+    if st.session_state.search_view:
+        render_search_view()
+
+    elif st.session_state.analytics_view:
+        render_analytics_view()
+
+    elif st.session_state.additional_features:
         for message in st.session_state.additional_features_messages:
             with st.chat_message(message["role"]):
                 st.markdown(message["content"])
@@ -327,6 +638,17 @@ def main():
 
         text = "Options to generate additional documents based on extracted data"
         st.markdown(f"<h5 style='text-align:center'>{text}</h5>", unsafe_allow_html=True)
+
+        # Documents can be generated from this session's extraction or from a stored project
+        projects = analytics.list_projects()
+        options = ([None] if st.session_state.extracted_data else []) + [project["ProjectID"] for project in projects]
+        labels = {project["ProjectID"]: f"{project['ProjectName']} ({project['ClientName']})" for project in projects}
+        if not options:
+            st.info("Extract data from a communication dump or save a project first.")
+        ProjectID = st.selectbox("Source", options, format_func=lambda option: "Current session" if option is None else labels[option])
+
+        def document_data():
+            return st.session_state.extracted_data if ProjectID is None else load_project(ProjectID)
         st.markdown("---")
         col1, col2, col3, col4, = st.columns(4)
 
@@ -334,43 +656,43 @@ def main():
             # Generate User Stories 
             if st.button("Generate User Stories"):
                 with st.spinner("Generating User Stories..."):
-                    prompt_text = f""" {user_stories_prompt.content} Json File with infomation: 
-                    {st.session_state.extracted_data}"""
-                    response = llm.invoke([HumanMessage(content=prompt_text)])
+                    response = invoke_llm(llm, f""" {user_stories_prompt.content} """,
+                                          f"""Json File with infomation:
+                    {document_data()}""", "llm.user_stories", BACKGROUND)
                     response = response.content
-                    st.session_state.additional_features_messages.append({"role": "assistant","content": response})
+                    remember_message("additional_features_messages", {"role": "assistant","content": response})
                     st.rerun()
         with col2:
             # Generate business rules
             if st.button("Generate Business Rules"):
                 with st.spinner("Generating Business Rules..."):
-                    prompt_text = f""" {business_rules.content} Json File with infomation:
-                    {st.session_state.extracted_data}"""
-                    response = llm.invoke([HumanMessage(content=prompt_text)])
+                    response = invoke_llm(llm, f""" {business_rules.content} """,
+                                          f"""Json File with infomation:
+                    {document_data()}""", "llm.business_rules", BACKGROUND)
                     response = response.content
-                    st.session_state.additional_features_messages.append({"role": "assistant","content": response})
+                    remember_message("additional_features_messages", {"role": "assistant","content": response})
                     st.rerun()
 
         with col3:
             # Generate Functional Requirements 
             if st.button("Generate Functional Requirements"):
                 with st.spinner("Generating Functional Requirements..."):
-                    prompt_text = f""" {functional_requirements.content} Json File with infomation:
-                    {st.session_state.extracted_data}"""
-                    response = llm.invoke([HumanMessage(content=prompt_text)])
+                    response = invoke_llm(llm, f""" {functional_requirements.content} """,
+                                          f"""Json File with infomation:
+                    {document_data()}""", "llm.functional_requirements", BACKGROUND)
                     response = response.content
-                    st.session_state.additional_features_messages.append({"role": "assistant","content": response})
+                    remember_message("additional_features_messages", {"role": "assistant","content": response})
                     st.rerun()
 
         with col4:
             # Generate Project Inception Brief
             if st.button("Generate Project Inception Brief"):
                 with st.spinner("Generating Project Inception Brief..."):
-                    prompt_text = f""" {Project_Inception_Brief.content} Json File with infomation:
-                    {st.session_state.extracted_data}"""
-                    response = llm.invoke([HumanMessage(content=prompt_text)])
+                    response = invoke_llm(llm, f""" {Project_Inception_Brief.content} """,
+                                          f"""Json File with infomation:
+                    {document_data()}""", "llm.inception_brief", BACKGROUND)
                     response = response.content
-                    st.session_state.additional_features_messages.append({"role": "assistant","content": response})
+                    remember_message("additional_features_messages", {"role": "assistant","content": response})
                     st.rerun()
 
 
@@ -394,7 +716,7 @@ def main():
         if prompt:
 
             # Add user message to chat history
-            st.session_state.messages.append({"role": "user", "content": prompt})
+            remember_message("messages", {"role": "user", "content": prompt})
             
             # Display user message
             with st.chat_message("user"):
@@ -419,7 +741,7 @@ def main():
                         
                         
                         st.markdown(response)
-                        st.session_state.messages.append({"role": "assistant", "content": response})
+                        remember_message("messages", {"role": "assistant", "content": response})
                     
                     # Move to next question
                     st.session_state.current_question_index += 1
@@ -431,7 +753,7 @@ def main():
                         st.session_state.clarification_questions = []
                         st.session_state.missing_fields = []
 
-                        rag_graph = setup_rag_pipeline(vector_store, llm)
+                        rag_graph = setup_rag_pipeline(vector_store, llm, kb_namespaces)
 
                         if rag_graph:
                             with st.chat_message("assistant"):
@@ -439,10 +761,11 @@ def main():
                                     try:
                                         # Include chat history in the prompt
                                         chat_history = "\n".join(
-                                            f"{message['role'].capitalize()}: {message['content']}" for message in st.session_state.messages
+                                            f"{message['role'].capitalize()}: {message['content']}"
+                                            for message in store.all_messages(st.session_state.session_id, "messages")
                                         )
                                         # Run RAG pipeline with clarification answers
-                                        result = rag_graph.invoke({"question": chat_history})
+                                        result = rag_graph.invoke({"question": chat_history, "namespace": current_namespace(kb_namespaces)})
                                         answer = result.get("answer", "Sorry, I couldn't process the clarification answers.")
 
                                         # Update session state with new extracted information
@@ -470,18 +793,18 @@ def main():
                                             st.session_state.current_question_index = 0
                                             clarification_msg = f"I found some new information but need clarification on {len(st.session_state.clarification_questions)} items. I'll ask you one by one:"
                                             st.markdown(clarification_msg)
-                                            st.session_state.messages.append({"role": "assistant", "content": clarification_msg})
+                                            remember_message("messages", {"role": "assistant", "content": clarification_msg})
                                             
                                         else:
                                             st.session_state.missing_fields = []
                                             st.session_state.extraction_done = True
                                             st.markdown("No further clarification needed. All data processed successfully.")
-                                            st.session_state.messages.append({"role": "assistant", "content": answer})
+                                            remember_message("messages", {"role": "assistant", "content": answer})
 
                                     except Exception as e:
                                         error_msg = f"Error processing clarification answers: {e}"
                                         st.error(error_msg)
-                                        st.session_state.messages.append({"role": "assistant", "content": error_msg})
+                                        remember_message("messages", {"role": "assistant", "content": error_msg})
                         else:
                             st.error("Failed to set up analysis pipeline.")
 
@@ -490,14 +813,14 @@ def main():
             
             else:
                 # Process communication dump
-                rag_graph = setup_rag_pipeline(vector_store, llm)
+                rag_graph = setup_rag_pipeline(vector_store, llm, kb_namespaces)
                 
                 if rag_graph:
                     with st.chat_message("assistant"):
                         with st.spinner("Analyzing communication dump..."):
                             try:
                                 # Run RAG pipeline
-                                result = rag_graph.invoke({"question": prompt})
+                                result = rag_graph.invoke({"question": prompt, "namespace": current_namespace(kb_namespaces)})
                                 answer = result.get("answer", "Sorry, I couldn't analyze the communication dump.")
                                 
                                 # Update session state with extracted information (append, don't replace)
@@ -519,7 +842,7 @@ def main():
 
                                 # Display analysis result
                                 st.markdown(answer)
-                                st.session_state.messages.append({"role": "assistant", "content": answer})
+                                remember_message("messages", {"role": "assistant", "content": answer})
 
                                 # Start clarification process if needed
                                 if st.session_state.clarification_questions and not st.session_state.asking_clarification:
@@ -527,14 +850,14 @@ def main():
                                     st.session_state.current_question_index = 0
                                     clarification_msg = f"I found some information but need clarification on {len(st.session_state.clarification_questions)} items. I'll ask you one by one:"
                                     st.markdown(clarification_msg)
-                                    st.session_state.messages.append({"role": "assistant", "content": clarification_msg})
+                                    remember_message("messages", {"role": "assistant", "content": clarification_msg})
                                     st.rerun()
 
                                 
                             except Exception as e:
                                 error_msg = f"Error analyzing communication dump: {e}"
                                 st.error(error_msg)
-                                st.session_state.messages.append({
+                                remember_message("messages", {
                                     "role": "assistant", 
                                     "content": error_msg
                                 })
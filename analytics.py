@@ -0,0 +1,169 @@
+import sqlite3
+
+# Summary tables kept up to date by Rag_to_DB.main after every payload.
+# Each refresh only touches the rows of the affected project (and its industry),
+# so reads stay small lookups instead of multi-join aggregate scans.
+
+
+def create_analytics_tables(cursor):
+    """Create the summary tables and the indexes used to refresh them."""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS RequirementSummary (
+        ProjectID INTEGER,
+        RequirementCategoryID INTEGER,
+        PriorityType VARCHAR(20),
+        Type BOOLEAN,
+        RequirementCount INTEGER,
+        PRIMARY KEY (ProjectID, RequirementCategoryID, PriorityType, Type))
+    ''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS ConstraintSummary (
+        ProjectID INTEGER,
+        ConstraintTypeID INTEGER,
+        Severity VARCHAR(10),
+        ConstraintCount INTEGER,
+        PRIMARY KEY (ProjectID, ConstraintTypeID, Severity))
+    ''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS TechnologyAdoption (
+        IndustryID INTEGER,
+        TechID INTEGER,
+        Status VARCHAR(15),
+        ProjectCount INTEGER,
+        PRIMARY KEY (IndustryID, TechID, Status))
+    ''')
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_requirements_project ON Requirements (ProjectID)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_constraints_project ON Constraints (ProjectID)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_project_client ON Project (ClientID)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_clients_industry ON Clients (IndustryID)")
+
+
+def refresh_project_summaries(cursor, ProjectID):
+    """Recompute the summary rows for one project and its client's industry."""
+    cursor.execute("DELETE FROM RequirementSummary WHERE ProjectID = ?", (ProjectID,))
+    cursor.execute('''
+    INSERT INTO RequirementSummary (ProjectID, RequirementCategoryID, PriorityType, Type, RequirementCount)
+    SELECT ProjectID, RequirementCategoryID, PriorityType, Type, COUNT(*)
+    FROM Requirements WHERE ProjectID = ?
+    GROUP BY ProjectID, RequirementCategoryID, PriorityType, Type
+    ''', (ProjectID,))
+
+    cursor.execute("DELETE FROM ConstraintSummary WHERE ProjectID = ?", (ProjectID,))
+    cursor.execute('''
+    INSERT INTO ConstraintSummary (ProjectID, ConstraintTypeID, Severity, ConstraintCount)
+    SELECT ProjectID, ConstraintTypeID, Severity, COUNT(*)
+    FROM Constraints WHERE ProjectID = ?
+    GROUP BY ProjectID, ConstraintTypeID, Severity
+    ''', (ProjectID,))
+
+    cursor.execute('''
+    SELECT Clients.IndustryID FROM Project
+    JOIN Clients ON Clients.ClientID = Project.ClientID
+    WHERE Project.ProjectID = ?
+    ''', (ProjectID,))
+    result = cursor.fetchone()
+    if result:
+        refresh_industry_adoption(cursor, result[0])
+
+
+def refresh_industry_adoption(cursor, IndustryID):
+    """Recompute technology adoption counts for a single industry."""
+    cursor.execute("DELETE FROM TechnologyAdoption WHERE IndustryID IS ?", (IndustryID,))
+    cursor.execute('''
+    INSERT INTO TechnologyAdoption (IndustryID, TechID, Status, ProjectCount)
+    SELECT Clients.IndustryID, ProjectTechnology.TechID, ProjectTechnology.Status, COUNT(*)
+    FROM ProjectTechnology
+    JOIN Project ON Project.ProjectID = ProjectTechnology.ProjectID
+    JOIN Clients ON Clients.ClientID = Project.ClientID
+    WHERE Clients.IndustryID IS ?
+    GROUP BY Clients.IndustryID, ProjectTechnology.TechID, ProjectTechnology.Status
+    ''', (IndustryID,))
+
+
+def rebuild_analytics(database_path='my_DB.db'):
+    """Create the summary tables if needed and backfill them from scratch."""
+    conn = sqlite3.connect(database_path)
+    cursor = conn.cursor()
+    create_analytics_tables(cursor)
+    cursor.execute("DELETE FROM RequirementSummary")
+    cursor.execute("DELETE FROM ConstraintSummary")
+    cursor.execute("DELETE FROM TechnologyAdoption")
+    for (ProjectID,) in cursor.execute("SELECT ProjectID FROM Project").fetchall():
+        refresh_project_summaries(cursor, ProjectID)
+    conn.commit()
+    conn.close()
+
+
+def ensure_analytics(database_path='my_DB.db'):
+    """Migrate an existing database: create and backfill the summaries once."""
+    conn = sqlite3.connect(database_path)
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'RequirementSummary'").fetchone()
+    conn.close()
+    if not exists:
+        rebuild_analytics(database_path)
+
+
+def _query(database_path, query, params=()):
+    conn = sqlite3.connect(database_path)
+    conn.row_factory = sqlite3.Row
+    rows = [dict(row) for row in conn.execute(query, params).fetchall()]
+    conn.close()
+    return rows
+
+
+def requirements_by_category(ProjectID=None, database_path='my_DB.db'):
+    """Requirement counts by category, priority and type (optionally for one project)."""
+    return _query(database_path, '''
+    SELECT RequirementCategories.RequirementCategoryName AS Category,
+           RequirementSummary.PriorityType AS Priority,
+           CASE RequirementSummary.Type WHEN 1 THEN 'Functional' ELSE 'Non-functional' END AS Type,
+           SUM(RequirementSummary.RequirementCount) AS Requirements
+    FROM RequirementSummary
+    LEFT JOIN RequirementCategories
+      ON RequirementCategories.RequirementCategoryID = RequirementSummary.RequirementCategoryID
+    WHERE ? IS NULL OR RequirementSummary.ProjectID = ?
+    GROUP BY Category, Priority, RequirementSummary.Type
+    ORDER BY Requirements DESC
+    ''', (ProjectID, ProjectID))
+
+
+def constraints_by_type(ProjectID=None, database_path='my_DB.db'):
+    """Constraint counts by type and severity (optionally for one project)."""
+    return _query(database_path, '''
+    SELECT ConstraintType.ConstraintTypeName AS ConstraintType,
+           ConstraintSummary.Severity AS Severity,
+           SUM(ConstraintSummary.ConstraintCount) AS Constraints
+    FROM ConstraintSummary
+    LEFT JOIN ConstraintType ON ConstraintType.ConstraintTypeID = ConstraintSummary.ConstraintTypeID
+    WHERE ? IS NULL OR ConstraintSummary.ProjectID = ?
+    GROUP BY ConstraintType, Severity
+    ORDER BY Constraints DESC
+    ''', (ProjectID, ProjectID))
+
+
+def technology_by_industry(IndustryName=None, database_path='my_DB.db'):
+    """Number of projects using each technology, per industry and status."""
+    return _query(database_path, '''
+    SELECT Industry.IndustryName AS Industry,
+           TechnologyStack.TechName AS Technology,
+           TechnologyAdoption.Status AS Status,
+           TechnologyAdoption.ProjectCount AS Projects
+    FROM TechnologyAdoption
+    LEFT JOIN Industry ON Industry.IndustryID = TechnologyAdoption.IndustryID
+    LEFT JOIN TechnologyStack ON TechnologyStack.TechID = TechnologyAdoption.TechID
+    WHERE ? IS NULL OR Industry.IndustryName = ?
+    ORDER BY Projects DESC
+    ''', (IndustryName, IndustryName))
+
+
+def list_projects(database_path='my_DB.db'):
+    """Project IDs and names for the analytics project picker."""
+    return _query(database_path, '''
+    SELECT Project.ProjectID, Project.ProjectName, Clients.ClientName
+    FROM Project LEFT JOIN Clients ON Clients.ClientID = Project.ClientID
+    ORDER BY Project.ProjectID
+    ''')
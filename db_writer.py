@@ -0,0 +1,121 @@
+import uuid
+import queue
+import sqlite3
+import threading
+from datetime import datetime
+
+import Rag_to_DB
+from tracing import trace_stage
+
+# Payloads drained from the queue and committed together in one transaction
+BATCH_SIZE = 16
+# Finished jobs kept around so sessions can still poll their status
+MAX_FINISHED_JOBS = 1000
+
+
+class DBWriter:
+    """Single background thread that owns the SQLite connection.
+
+    Sessions submit payloads and get a job ID back straight away. The thread
+    saves queued payloads through Rag_to_DB.save with per-helper commits
+    deferred and commits each batch once. Every payload runs inside its own
+    savepoint, so a payload that fails (an error string or an unexpected
+    exception) only rolls back its own rows.
+    """
+
+    def __init__(self, database_path='my_DB.db', batch_size=BATCH_SIZE):
+        self.database_path = database_path
+        self.batch_size = batch_size
+        self.queue = queue.Queue()
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, data, near_duplicates=None):
+        """Queue a payload for saving and return its job ID."""
+        job_id = uuid.uuid4().hex[:12]
+        with self.lock:
+            self.jobs[job_id] = {"status": "queued", "result": None, "duplicates": 0,
+                                 "submitted": datetime.now().isoformat(timespec="seconds")}
+        self.queue.put((job_id, data, near_duplicates))
+        return job_id
+
+    def status(self, job_id):
+        """Current status of a job: queued, running, saved or failed (with its message)."""
+        with self.lock:
+            return dict(self.jobs.get(job_id, {"status": "unknown", "result": None}))
+
+    def pending(self):
+        return self.queue.qsize()
+
+    def _set(self, job_id, **fields):
+        with self.lock:
+            self.jobs[job_id].update(fields)
+
+    def _prune(self):
+        with self.lock:
+            finished = [job_id for job_id, job in self.jobs.items() if job["status"] in ("saved", "failed")]
+            for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+                del self.jobs[job_id]
+
+    @staticmethod
+    def _snapshots(batch):
+        """Snapshot of every distinct duplicate index used by a batch, keyed by id()."""
+        return {id(near_duplicates): (near_duplicates, near_duplicates.snapshot())
+                for _, _, near_duplicates in batch if near_duplicates is not None}
+
+    def _run(self):
+        conn = sqlite3.connect(self.database_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            with trace_stage("db.writer.batch", jobs=len(batch)):
+                results = {}
+                Rag_to_DB.defer_commits = True
+                # Vectors added to the shared duplicate indexes must be undone with their rows
+                batch_snapshots = self._snapshots(batch)
+                try:
+                    # Open the batch transaction explicitly so releasing a savepoint does not commit
+                    conn.execute("BEGIN")
+                    for job_id, data, near_duplicates in batch:
+                        self._set(job_id, status="running")
+                        conn.execute("SAVEPOINT payload")
+                        snapshot = near_duplicates.snapshot() if near_duplicates is not None else None
+                        try:
+                            results[job_id] = Rag_to_DB.save(data, conn, near_duplicates)
+                        except Exception as e:
+                            results[job_id] = f"Error: {e}"
+                        if results[job_id] is True:
+                            conn.execute("RELEASE payload")
+                            if near_duplicates is not None:
+                                self._set(job_id, duplicates=len(near_duplicates.events))
+                        else:
+                            # Helpers report most failures by returning an error string; undo the
+                            # payload's rows either way so a resubmission does not duplicate them
+                            conn.execute("ROLLBACK TO payload")
+                            conn.execute("RELEASE payload")
+                            if snapshot is not None:
+                                near_duplicates.restore(snapshot)
+                    conn.commit()
+                except sqlite3.Error as e:
+                    conn.rollback()
+                    for near_duplicates, snapshot in batch_snapshots.values():
+                        near_duplicates.restore(snapshot)
+                    results = {job_id: f"Error: {e}" for job_id, _, _ in batch}
+                finally:
+                    Rag_to_DB.defer_commits = False
+
+            for job_id, result in results.items():
+                if result is True:
+                    self._set(job_id, status="saved", result=True)
+                else:
+                    self._set(job_id, status="failed", result=str(result))
+            self._prune()
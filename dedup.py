@@ -0,0 +1,159 @@
+import sqlite3
+from collections import OrderedDict
+
+import numpy as np
+
+# Similarity above which two descriptions of the same client are treated as the same item
+DUPLICATE_THRESHOLD = 0.92
+# "merge" skips the new row, "flag" inserts it and records it in DuplicateCandidates
+DUPLICATE_MODE = "merge"
+# Clients whose vectors stay loaded; the least recently used are reloaded from DescriptionEmbeddings
+MAX_LOADED_CLIENTS = 128
+
+
+def create_dedup_tables(cursor):
+    """Tables holding the stored description embeddings and flagged duplicates."""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS DescriptionEmbeddings (
+        Kind VARCHAR(20),
+        RowID INTEGER,
+        ProjectID INTEGER,
+        Vector BLOB,
+        PRIMARY KEY (Kind, RowID))
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_project ON DescriptionEmbeddings (Kind, ProjectID)")
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS DuplicateCandidates (
+        Kind VARCHAR(20),
+        RowID INTEGER,
+        DuplicateOfID INTEGER,
+        Similarity FLOAT,
+        PRIMARY KEY (Kind, RowID))
+    ''')
+
+
+def ensure_dedup_tables(database_path='my_DB.db'):
+    conn = sqlite3.connect(database_path)
+    create_dedup_tables(conn.cursor())
+    conn.commit()
+    conn.close()
+
+
+class DuplicateIndex:
+    """In-memory vector index over requirement and constraint descriptions.
+
+    Vectors are grouped per (table, client): every save creates a new project,
+    so items are compared against all projects of the same client, which
+    catches requirements restated in a later session. Projects without a client
+    form their own group. A group is loaded from DescriptionEmbeddings the first
+    time it is queried; rows without a stored vector are embedded once and
+    saved, and new rows are appended as they are inserted, so the index is never
+    rebuilt. Only the max_loaded most recently used groups stay in memory.
+    """
+
+    def __init__(self, embedding_model, threshold=DUPLICATE_THRESHOLD, mode=DUPLICATE_MODE,
+                 max_loaded=MAX_LOADED_CLIENTS):
+        self.embedding_model = embedding_model
+        self.threshold = threshold
+        self.mode = mode
+        self.max_loaded = max_loaded
+        self.vectors = OrderedDict()   # (table, group) -> (RowIDs, matrix), least recently used first
+        # (table, kept or flagged RowID, matched RowID, similarity) of the last save
+        self.events = []
+
+    def embed(self, texts):
+        vectors = np.asarray(self.embedding_model.embed_documents(texts), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    @staticmethod
+    def group(cursor, ProjectID):
+        """("Client", ClientID) of a project, or ("Project", ProjectID) if it has no client."""
+        cursor.execute("SELECT ClientID FROM Project WHERE ProjectID = ?", (ProjectID,))
+        row = cursor.fetchone()
+        if row is None or row[0] is None:
+            return ("Project", ProjectID)
+        return ("Client", row[0])
+
+    def load_group(self, cursor, table, ProjectID):
+        """RowIDs and vectors of every item of a table belonging to the project's client."""
+        group = self.group(cursor, ProjectID)
+        key = (table, *group)
+        if key in self.vectors:
+            self.vectors.move_to_end(key)
+            return self.vectors[key]
+
+        id_column = "RequirementID" if table == "Requirements" else "ConstraintID"
+        where = "Project.ClientID = ?" if group[0] == "Client" else f"{table}.ProjectID = ?"
+        cursor.execute(f'''
+        SELECT {table}.{id_column}, {table}.ProjectID, {table}.Description, DescriptionEmbeddings.Vector
+        FROM {table}
+        LEFT JOIN Project ON Project.ProjectID = {table}.ProjectID
+        LEFT JOIN DescriptionEmbeddings
+          ON DescriptionEmbeddings.Kind = ? AND DescriptionEmbeddings.RowID = {table}.{id_column}
+        WHERE {where}
+        ORDER BY {table}.{id_column}
+        ''', (table, group[1]))
+        rows = cursor.fetchall()
+
+        # Backfill rows stored before the index existed
+        missing = [(RowID, RowProjectID, description) for RowID, RowProjectID, description, vector in rows
+                   if vector is None]
+        stored = {}
+        if missing:
+            new_vectors = self.embed([description or "" for _, _, description in missing])
+            for (RowID, _, _), vector in zip(missing, new_vectors):
+                stored[RowID] = vector
+            cursor.executemany(
+                "INSERT OR REPLACE INTO DescriptionEmbeddings (Kind, RowID, ProjectID, Vector) VALUES (?, ?, ?, ?)",
+                [(table, RowID, RowProjectID, stored[RowID].tobytes()) for RowID, RowProjectID, _ in missing])
+
+        ids = []
+        matrix = []
+        for RowID, _, _, vector in rows:
+            ids.append(RowID)
+            matrix.append(stored[RowID] if vector is None else np.frombuffer(vector, dtype=np.float32))
+
+        self.vectors[key] = (ids, np.vstack(matrix) if matrix else None)
+        self._evict()
+        return self.vectors[key]
+
+    def _evict(self):
+        while len(self.vectors) > self.max_loaded:
+            self.vectors.popitem(last=False)
+
+    def find_duplicate(self, cursor, table, ProjectID, description):
+        """Return ((RowID, similarity) or None, vector of the new description)."""
+        vector = self.embed([description or ""])[0]
+        ids, matrix = self.load_group(cursor, table, ProjectID)
+        if not ids:
+            return None, vector
+
+        similarities = matrix @ vector
+        best = int(np.argmax(similarities))
+        if similarities[best] >= self.threshold:
+            return (ids[best], float(similarities[best])), vector
+        return None, vector
+
+    def add(self, cursor, table, ProjectID, RowID, vector):
+        """Store the vector of a newly inserted row and append it to its loaded group."""
+        cursor.execute(
+            "INSERT OR REPLACE INTO DescriptionEmbeddings (Kind, RowID, ProjectID, Vector) VALUES (?, ?, ?, ?)",
+            (table, RowID, ProjectID, vector.tobytes()))
+        key = (table, *self.group(cursor, ProjectID))
+        if key in self.vectors:
+            ids, matrix = self.vectors[key]
+            matrix = vector[None, :] if matrix is None else np.vstack([matrix, vector])
+            self.vectors[key] = (ids + [RowID], matrix)
+
+    def snapshot(self):
+        """State of the loaded groups, to restore if the rows behind them are rolled back.
+
+        Entries are replaced rather than changed in place, so a shallow copy (of
+        at most max_loaded entries) is enough.
+        """
+        return OrderedDict(self.vectors)
+
+    def restore(self, snapshot):
+        self.vectors = OrderedDict(snapshot)
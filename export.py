@@ -0,0 +1,210 @@
+import os
+import json
+import sqlite3
+import argparse
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from tracing import trace_stage
+
+EXPORT_DIR = "exports"
+# Rows read from SQLite and written as one Parquet row group at a time
+CHUNK_SIZE = 50000
+WATERMARK_FILE = "_watermarks.json"
+
+# Denormalised datasets. Incremental datasets expose their base table's
+# INTEGER PRIMARY KEY (its rowid, which VACUUM never renumbers) as RowKey, the
+# watermark of incremental exports. ProjectTechnology only has a composite
+# key, so its rowid may change; that dataset is rewritten in full every run.
+DATASETS = {
+    "project_requirements": {
+        "query": '''
+        SELECT Requirements.rowid AS RowKey,
+               Requirements.RequirementID, Project.ProjectID, Project.ProjectName, Project.ProjectStatus,
+               Project.DeliveryModel, Project.StartDate, Project.EndDate, Project.Budget, Project.NumUsers,
+               Clients.ClientID, Clients.ClientName, Industry.IndustryName,
+               CASE Requirements.Type WHEN 1 THEN 'Functional' ELSE 'Non-functional' END AS RequirementType,
+               Requirements.Description, Requirements.Status, Requirements.PriorityType,
+               RequirementCategories.RequirementCategoryName,
+               InteractionLog.InteractionID, InteractionLog.Timestamp AS InteractionDate,
+               SourceType.SourceTypeName, InteractionLog.ExtractedSummary, InteractionLog.RawTextHash
+        FROM Requirements
+        LEFT JOIN Project ON Project.ProjectID = Requirements.ProjectID
+        LEFT JOIN Clients ON Clients.ClientID = Project.ClientID
+        LEFT JOIN Industry ON Industry.IndustryID = Clients.IndustryID
+        LEFT JOIN RequirementCategories
+          ON RequirementCategories.RequirementCategoryID = Requirements.RequirementCategoryID
+        LEFT JOIN InteractionLog ON InteractionLog.InteractionID = Requirements.InteractionID
+        LEFT JOIN SourceType ON SourceType.SourceTypeID = InteractionLog.SourceTypeID
+        WHERE Requirements.rowid > ?
+        ORDER BY Requirements.rowid
+        ''',
+        "schema": pa.schema([
+            ("RowKey", pa.int64()), ("RequirementID", pa.int64()), ("ProjectID", pa.int64()),
+            ("ProjectName", pa.string()), ("ProjectStatus", pa.string()), ("DeliveryModel", pa.string()),
+            ("StartDate", pa.string()), ("EndDate", pa.string()), ("Budget", pa.float64()),
+            ("NumUsers", pa.int64()), ("ClientID", pa.int64()), ("ClientName", pa.string()),
+            ("IndustryName", pa.string()), ("RequirementType", pa.string()), ("Description", pa.string()),
+            ("Status", pa.string()), ("PriorityType", pa.string()), ("RequirementCategoryName", pa.string()),
+            ("InteractionID", pa.int64()), ("InteractionDate", pa.string()), ("SourceTypeName", pa.string()),
+            ("ExtractedSummary", pa.string()), ("RawTextHash", pa.string()),
+        ]),
+    },
+    "project_constraints": {
+        "query": '''
+        SELECT Constraints.rowid AS RowKey,
+               Constraints.ConstraintID, Project.ProjectID, Project.ProjectName,
+               Clients.ClientID, Clients.ClientName, Industry.IndustryName,
+               ConstraintType.ConstraintTypeName, Constraints.Description, Constraints.Severity,
+               InteractionLog.InteractionID, InteractionLog.Timestamp AS InteractionDate,
+               SourceType.SourceTypeName
+        FROM Constraints
+        LEFT JOIN Project ON Project.ProjectID = Constraints.ProjectID
+        LEFT JOIN Clients ON Clients.ClientID = Project.ClientID
+        LEFT JOIN Industry ON Industry.IndustryID = Clients.IndustryID
+        LEFT JOIN ConstraintType ON ConstraintType.ConstraintTypeID = Constraints.ConstraintTypeID
+        LEFT JOIN InteractionLog ON InteractionLog.InteractionID = Constraints.InteractionID
+        LEFT JOIN SourceType ON SourceType.SourceTypeID = InteractionLog.SourceTypeID
+        WHERE Constraints.rowid > ?
+        ORDER BY Constraints.rowid
+        ''',
+        "schema": pa.schema([
+            ("RowKey", pa.int64()), ("ConstraintID", pa.int64()), ("ProjectID", pa.int64()),
+            ("ProjectName", pa.string()), ("ClientID", pa.int64()), ("ClientName", pa.string()),
+            ("IndustryName", pa.string()), ("ConstraintTypeName", pa.string()), ("Description", pa.string()),
+            ("Severity", pa.string()), ("InteractionID", pa.int64()), ("InteractionDate", pa.string()),
+            ("SourceTypeName", pa.string()),
+        ]),
+    },
+    "project_technology": {
+        "incremental": False,
+        "query": '''
+        SELECT Project.ProjectID, Project.ProjectName, Clients.ClientID, Clients.ClientName,
+               Industry.IndustryName, TechnologyStack.TechID, TechnologyStack.TechName,
+               TechnologyStack.Category, ProjectTechnology.Status
+        FROM ProjectTechnology
+        LEFT JOIN Project ON Project.ProjectID = ProjectTechnology.ProjectID
+        LEFT JOIN Clients ON Clients.ClientID = Project.ClientID
+        LEFT JOIN Industry ON Industry.IndustryID = Clients.IndustryID
+        LEFT JOIN TechnologyStack ON TechnologyStack.TechID = ProjectTechnology.TechID
+        ORDER BY ProjectTechnology.ProjectID, ProjectTechnology.TechID
+        ''',
+        "schema": pa.schema([
+            ("ProjectID", pa.int64()), ("ProjectName", pa.string()),
+            ("ClientID", pa.int64()), ("ClientName", pa.string()), ("IndustryName", pa.string()),
+            ("TechID", pa.int64()), ("TechName", pa.string()), ("Category", pa.string()),
+            ("Status", pa.string()),
+        ]),
+    },
+}
+
+
+def load_watermarks(export_dir=EXPORT_DIR):
+    path = os.path.join(export_dir, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def save_watermarks(watermarks, export_dir=EXPORT_DIR):
+    # Write then rename so a crash never leaves a half-written watermark file
+    path = os.path.join(export_dir, WATERMARK_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(watermarks, file, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def is_incremental(name):
+    return DATASETS[name].get("incremental", True)
+
+
+def export_dataset(conn, name, since=0, export_dir=EXPORT_DIR, chunk_size=CHUNK_SIZE, replace=False):
+    """Stream one dataset into a new Parquet part file.
+
+    Returns (rows written, highest RowKey written, None for datasets that are
+    not incremental); no file is left behind when there is nothing new to
+    export. With replace (always for datasets that are not incremental), the
+    previous part files are removed once the new one is in place.
+    """
+    dataset = DATASETS[name]
+    schema = dataset["schema"]
+    incremental = is_incremental(name)
+    replace = replace or not incremental
+    folder = os.path.join(export_dir, name)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"part-{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{since}.parquet")
+
+    writer = None
+    rows = 0
+    watermark = since if incremental else None
+    params = (since,) if incremental else ()
+    try:
+        for chunk in pd.read_sql_query(dataset["query"], conn, params=params, chunksize=chunk_size):
+            if chunk.empty:
+                continue
+            table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path + ".tmp", schema, compression="zstd")
+            writer.write_table(table)
+            rows += len(chunk)
+            if incremental:
+                watermark = int(chunk["RowKey"].iloc[-1])
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is not None:
+        os.replace(path + ".tmp", path)
+    if replace:
+        for part in os.listdir(folder):
+            if part.endswith(".parquet") and os.path.join(folder, part) != path:
+                os.remove(os.path.join(folder, part))
+    return rows, watermark
+
+
+def export_all(database_path='my_DB.db', export_dir=EXPORT_DIR, full=False, chunk_size=CHUNK_SIZE):
+    """Export every dataset, incrementally from the stored watermarks unless full is set.
+
+    All datasets are read inside one read transaction, so they describe the
+    same snapshot of the database while the app keeps writing (WAL mode).
+    Each dataset's watermark is saved as soon as its part file is in place,
+    so a crash in a later dataset never re-exports an earlier one.
+    """
+    os.makedirs(export_dir, exist_ok=True)
+    # A full export is a fresh snapshot; each dataset's previous part files are
+    # dropped once its new one is written
+    watermarks = load_watermarks(export_dir)
+    summary = {}
+
+    conn = sqlite3.connect(database_path)
+    try:
+        conn.execute("BEGIN")
+        for name in DATASETS:
+            with trace_stage(f"export.{name}") as span:
+                since = 0 if full else watermarks.get(name, 0)
+                rows, watermark = export_dataset(conn, name, since, export_dir, chunk_size, replace=full)
+                span["rows"] = rows
+            if watermark is not None:
+                watermarks[name] = watermark
+                save_watermarks(watermarks, export_dir)
+            summary[name] = rows
+        conn.rollback()
+    finally:
+        conn.close()
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export my_DB.db to denormalised Parquet files.")
+    parser.add_argument("--db", default="my_DB.db", help="SQLite database to read")
+    parser.add_argument("--out", default=EXPORT_DIR, help="Output directory")
+    parser.add_argument("--full", action="store_true", help="Ignore watermarks and export everything")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Rows per Parquet row group")
+    args = parser.parse_args()
+
+    for name, rows in export_all(args.db, args.out, args.full, args.chunk_size).items():
+        print(f"{name}: {rows} rows")
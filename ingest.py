@@ -0,0 +1,153 @@
+import os
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from tracing import trace_stage
+from vector_index import INDEX_TYPES, build_vector_store, load_splits
+
+EMBEDDING_MODEL = "all-mpnet-base-v2"
+# Chunks per embedding task; large enough to keep each worker's batches full,
+# small enough that progress is reported often and work is spread evenly
+BATCH_SIZE = 64
+
+# Embedding model of a worker process, loaded once by _init_embedder
+_embedder = None
+
+
+def huggingface_embeddings(model_name):
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=model_name, encode_kwargs={"batch_size": BATCH_SIZE})
+
+
+def _init_embedder(factory, model_name, threads):
+    global _embedder
+    try:
+        import torch
+        # Split the cores between workers instead of every worker using all of them
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _embedder = factory(model_name)
+
+
+def _embed(texts):
+    return np.asarray(_embedder.embed_documents(texts), dtype=np.float32)
+
+
+def _parse(path, chunk_size, chunk_overlap):
+    return load_splits([path], chunk_size, chunk_overlap)
+
+
+def _pool(workers, **kwargs):
+    # spawn: forking a process that already holds torch threads can deadlock
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"), **kwargs)
+
+
+def parse_documents(paths, workers, progress, chunk_size=1000, chunk_overlap=200):
+    """Load and split Word documents in a process pool; splits keep the order of paths."""
+    if workers == 1 or len(paths) == 1:
+        results = []
+        for done, path in enumerate(paths, 1):
+            results.append(_parse(path, chunk_size, chunk_overlap))
+            progress("parse", done, len(paths))
+    else:
+        results = [None] * len(paths)
+        with _pool(min(workers, len(paths))) as pool:
+            futures = {pool.submit(_parse, path, chunk_size, chunk_overlap): position
+                       for position, path in enumerate(paths)}
+            for done, future in enumerate(as_completed(futures), 1):
+                results[futures[future]] = future.result()
+                progress("parse", done, len(paths))
+    return [split for splits in results for split in splits]
+
+
+def embed_splits(splits, embedding_model, workers, progress, batch_size=BATCH_SIZE, factory=huggingface_embeddings):
+    """Embed splits in batches spread over worker processes and stitch the batches back in order."""
+    texts = [split.page_content for split in splits]
+    batches = [texts[start:start + batch_size] for start in range(0, len(texts), batch_size)]
+    if not batches:
+        return np.empty((0, 0), dtype=np.float32)
+
+    if workers == 1 or len(batches) == 1:
+        parts = []
+        for done, batch in enumerate(batches, 1):
+            parts.append(np.asarray(embedding_model.embed_documents(batch), dtype=np.float32))
+            progress("embed", done, len(batches))
+        return np.vstack(parts)
+
+    workers = min(workers, len(batches))
+    model_name = getattr(embedding_model, "model_name", EMBEDDING_MODEL)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    parts = [None] * len(batches)
+    with _pool(workers, initializer=_init_embedder, initargs=(factory, model_name, threads)) as pool:
+        futures = {pool.submit(_embed, batch): position for position, batch in enumerate(batches)}
+        for done, future in enumerate(as_completed(futures), 1):
+            parts[futures[future]] = future.result()
+            progress("embed", done, len(batches))
+    return np.vstack(parts)
+
+
+def ingest(paths, embedding_model, index_type="Flat", params=None, workers=None,
+           batch_size=BATCH_SIZE, progress=None, factory=huggingface_embeddings):
+    """Build a knowledge-base vector store from Word documents using several processes.
+
+    Documents are parsed in a process pool, their chunks embedded in batches
+    by worker processes (each loading its own copy of the embedding model) and
+    the per-batch embeddings merged into one index of the chosen type.
+    embedding_model is kept by the store to embed queries. Returns the store
+    and stats including the throughput in chunks per second.
+    """
+    workers = workers or os.cpu_count() or 1
+    progress = progress or (lambda stage, done, total: None)
+    start = time.perf_counter()
+    with trace_stage("kb.ingest", workers=workers, documents=len(paths)) as span:
+        splits = parse_documents(paths, workers, progress)
+        parsed = time.perf_counter()
+        vectors = embed_splits(splits, embedding_model, workers, progress, batch_size, factory)
+        embedded = time.perf_counter()
+        vector_store = build_vector_store(splits, embedding_model, index_type, params, vectors=vectors)
+
+        seconds = time.perf_counter() - start
+        stats = {
+            "documents": len(paths),
+            "chunks": len(splits),
+            "workers": workers,
+            "parse_seconds": round(parsed - start, 3),
+            "embed_seconds": round(embedded - parsed, 3),
+            "index_seconds": round(time.perf_counter() - embedded, 3),
+            "seconds": round(seconds, 3),
+            "chunks_per_second": round(len(splits) / seconds, 1) if seconds else 0.0,
+        }
+        span.update(stats)
+    return vector_store, stats
+
+
+def print_progress(stage, done, total):
+    print(f"\r{stage}: {done}/{total}", end="\n" if done == total else "", flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the knowledge-base index from Word documents in parallel.")
+    parser.add_argument("documents", nargs="+", help="Word documents forming the corpus")
+    parser.add_argument("--workers", type=int, nargs="*", default=[os.cpu_count() or 1],
+                        help="Worker processes; give several counts to compare throughput")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--index", choices=INDEX_TYPES, default="Flat")
+    parser.add_argument("--model", default=EMBEDDING_MODEL, help="HuggingFace embedding model")
+    parser.add_argument("--out", help="Folder to save the index to (FAISS.save_local)")
+    args = parser.parse_args()
+
+    embedding_model = huggingface_embeddings(args.model)
+    for workers in args.workers:
+        vector_store, stats = ingest(args.documents, embedding_model, args.index, workers=workers,
+                                     batch_size=args.batch_size, progress=print_progress)
+        print(f"{workers} workers: {stats['chunks']} chunks from {stats['documents']} documents in "
+              f"{stats['seconds']:.1f}s ({stats['chunks_per_second']} chunks/s; parse {stats['parse_seconds']}s, "
+              f"embed {stats['embed_seconds']}s, index {stats['index_seconds']}s)")
+    if args.out:
+        vector_store.save_local(args.out)
+        print(f"Saved index to {args.out}")
@@ -0,0 +1,138 @@
+import os
+import re
+import glob
+import threading
+from collections import OrderedDict
+
+import faiss
+from langchain_community.vectorstores import FAISS
+
+from tracing import trace_stage
+from ingest import ingest
+from vector_index import set_search_params
+
+# Documents for a namespace live in knowledge_base/<name>/*.docx, where <name> is
+# an industry from the Industry lookup table (e.g. "Banking") or a client name.
+NAMESPACE_ROOT = "knowledge_base"
+INDEX_ROOT = "kb_indexes"
+MAX_MEMORY_MB = 512
+
+
+def slug(name):
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def index_bytes(index):
+    """Approximate memory of a faiss index from its vector count and per-vector size (no copy is made)."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        # Flat codes, level-0 neighbour ids (int32) and the per-vector level and offset
+        per_vector = faiss.downcast_index(index.storage).code_size + index.hnsw.nb_neighbors(0) * 4 + 12
+        return index.ntotal * per_vector
+    if isinstance(index, faiss.IndexIVF):
+        # Codes with their int64 ids, coarse centroids and, for PQ, the codebooks
+        codebooks = index.pq.centroids.size() * 4 if isinstance(index, faiss.IndexIVFPQ) else 0
+        return index.ntotal * (index.code_size + 8) + index.nlist * index.d * 4 + codebooks
+    return index.ntotal * index.code_size
+
+
+def session_route(extracted_data):
+    """Candidate namespace names for a session, most specific first: client, then industry."""
+    client = (extracted_data or {}).get("Clients") or {}
+    if not isinstance(client, dict):
+        return []
+    return [client.get("ClientName"), client.get("IndustryID")]
+
+
+class NamespaceStore:
+    """Per-industry / per-client vector stores, loaded lazily and kept in a memory-capped LRU.
+
+    A namespace is built from its documents on first use and saved under
+    kb_indexes/<slug>; later loads read the saved index unless a document is
+    newer. When the resident indexes exceed the memory cap, the least recently
+    used ones are dropped from memory (they stay on disk). Loading or building
+    only holds that namespace's guard, so other namespaces stay available.
+    """
+
+    def __init__(self, embedding_model, root=NAMESPACE_ROOT, index_root=INDEX_ROOT,
+                 max_memory_mb=MAX_MEMORY_MB, index_type="Flat", params=None, workers=1):
+        self.embedding_model = embedding_model
+        self.root = root
+        self.index_root = index_root
+        self.max_bytes = max_memory_mb * 1024 * 1024
+        self.index_type = index_type
+        self.params = params
+        self.workers = workers
+        self.loaded = OrderedDict()   # slug -> (vector store, estimated bytes)
+        self.guards = {}              # slug -> lock held while that namespace loads
+        self.lock = threading.Lock()
+
+    def namespaces(self):
+        """Namespace names (folder names) that have at least one document."""
+        if not os.path.isdir(self.root):
+            return {}
+        return {slug(name): name for name in os.listdir(self.root)
+                if glob.glob(os.path.join(self.root, name, "*.docx"))}
+
+    def resolve(self, names):
+        """First of the candidate names (e.g. client, then industry) that has a namespace."""
+        available = self.namespaces()
+        for name in names:
+            if name and slug(str(name)) in available:
+                return slug(str(name))
+        return None
+
+    def memory_usage(self):
+        with self.lock:
+            return sum(size for _, size in self.loaded.values())
+
+    def get(self, namespace):
+        """Vector store of a namespace (by slug), loading or building it if needed."""
+        with self.lock:
+            if namespace in self.loaded:
+                self.loaded.move_to_end(namespace)
+                return self.loaded[namespace][0]
+            guard = self.guards.setdefault(namespace, threading.Lock())
+
+        # Concurrent requests for the same namespace wait for one load instead of repeating it
+        with guard:
+            with self.lock:
+                if namespace in self.loaded:
+                    self.loaded.move_to_end(namespace)
+                    return self.loaded[namespace][0]
+
+            folder = self.namespaces().get(namespace)
+            if folder is None:
+                return None
+            with trace_stage("kb.namespace_load", namespace=namespace) as span:
+                vector_store, span["source"] = self._load_or_build(namespace, os.path.join(self.root, folder))
+            size = self._estimate_bytes(vector_store)
+            with self.lock:
+                self.loaded[namespace] = (vector_store, size)
+                self._evict()
+            return vector_store
+
+    def _load_or_build(self, namespace, folder):
+        documents = glob.glob(os.path.join(folder, "*.docx"))
+        index_path = os.path.join(self.index_root, namespace)
+        saved = os.path.join(index_path, "index.faiss")
+
+        if os.path.exists(saved) and os.path.getmtime(saved) >= max(os.path.getmtime(path) for path in documents):
+            vector_store = FAISS.load_local(index_path, self.embedding_model, allow_dangerous_deserialization=True)
+            set_search_params(vector_store.index, self.params)
+            return vector_store, "disk"
+
+        vector_store, _ = ingest(documents, self.embedding_model, self.index_type, self.params, workers=self.workers)
+        os.makedirs(index_path, exist_ok=True)
+        vector_store.save_local(index_path)
+        return vector_store, "built"
+
+    def _estimate_bytes(self, vector_store):
+        text_bytes = sum(len(doc.page_content) for doc in vector_store.docstore._dict.values())
+        return index_bytes(vector_store.index) + text_bytes
+
+    def _evict(self):
+        # Always keep the namespace that was just loaded, even if it alone exceeds the cap
+        while len(self.loaded) > 1 and sum(size for _, size in self.loaded.values()) > self.max_bytes:
+            namespace, _ = self.loaded.popitem(last=False)
+            print(f"Evicted knowledge base namespace '{namespace}' from memory.")
@@ -0,0 +1,192 @@
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+# Rule- and dictionary-based extraction of the fields that can be read off a
+# dump exactly. A value is only returned when the dump is unambiguous about it
+# (e.g. a single distinct email address); everything else is left to the LLM.
+
+MONTHS = "january|february|march|april|may|june|july|august|september|october|november|december"
+MONTH_ABBREVIATIONS = "jan|feb|mar|apr|jun|jul|aug|sep|sept|oct|nov|dec"
+_MONTH = rf"(?:{MONTHS}|{MONTH_ABBREVIATIONS})\.?"
+
+EMAIL = re.compile(r"\b[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b")
+PHONE = re.compile(r"(?<![\w+])(?:\+\d{1,3}[\s.-]?)?(?:\(\d{1,5}\)[\s.-]?)?\d{2,5}(?:[\s.-]?\d{2,5}){1,4}(?!\w)")
+DATE = re.compile(
+    rf"\b(?:\d{{4}}-\d{{2}}-\d{{2}}"
+    rf"|\d{{1,2}}(?:st|nd|rd|th)?\s+(?:of\s+)?{_MONTH}\s*,?\s*\d{{4}}"
+    rf"|{_MONTH}\s+\d{{1,2}}(?:st|nd|rd|th)?\s*,?\s*\d{{4}}"
+    rf"|\d{{1,2}}/\d{{1,2}}/\d{{4}})\b",
+    re.IGNORECASE)
+START_DATE = re.compile(rf"\b(?:start|starting|kick[- ]?off|commenc\w*|begin\w*)\b[^\d\n]{{0,30}}?({DATE.pattern})",
+                        re.IGNORECASE)
+END_DATE = re.compile(rf"\b(?:end|ending|finish\w*|complet\w*|deadline|deliver\w*|go[- ]live|launch\w*)\b"
+                      rf"[^\d\n]{{0,30}}?({DATE.pattern})", re.IGNORECASE)
+MONEY = re.compile(r"([£$€])\s?(\d[\d,]*(?:\.\d+)?)\s?(k|m|million|thousand)?\b", re.IGNORECASE)
+BUDGET = re.compile(rf"\bbudget\b[^£$€\n]{{0,40}}?{MONEY.pattern}", re.IGNORECASE)
+NUM_USERS = re.compile(r"\b(\d[\d,]*)\s+(?:\w+\s+)?(?:users|employees|staff|seats|people|agents)\b", re.IGNORECASE)
+
+MULTIPLIERS = {"k": 1000, "thousand": 1000, "m": 1000000, "million": 1000000}
+# Names shorter than this are too likely to match ordinary words
+MIN_NAME_LENGTH = 3
+
+# Ways a MISSING DATA line can name each pre-extracted field, compared after
+# dropping case, spaces and underscores. A line is only dropped when it is
+# nothing but one of these (optionally prefixed by its section).
+FIELD_NAMES = {
+    "ContactEmail": ("contactemail", "email"),
+    "ContactNumber": ("contactnumber", "phonenumber", "phone"),
+    "IndustryID": ("industryid", "industry"),
+    "StartDate": ("startdate",),
+    "EndDate": ("enddate",),
+    "Budget": ("budget",),
+    "NumUsers": ("numusers", "numberofusers"),
+    "SourceTypeID": ("sourcetypeid", "sourcetype"),
+}
+SECTION_PREFIX = re.compile(r"^(?:clients|project|interactionid|interaction)[.:>/-]+")
+
+
+def parse_date(text):
+    """ISO date (YYYY-MM-DD) of a DATE match; day-first for dd/mm/yyyy."""
+    cleaned = re.sub(r"(\d)(st|nd|rd|th)\b", r"\1", text, flags=re.IGNORECASE)
+    cleaned = re.sub(r"\bof\b|,|\.", " ", cleaned, flags=re.IGNORECASE)
+    cleaned = re.sub(r"\bsept\b", "sep", " ".join(cleaned.split()), flags=re.IGNORECASE)
+    for date_format in ("%Y-%m-%d", "%d %B %Y", "%d %b %Y", "%B %d %Y", "%b %d %Y", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(cleaned, date_format).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+
+def parse_amount(number, unit):
+    value = float(number.replace(",", "")) * MULTIPLIERS.get((unit or "").lower(), 1)
+    return int(value) if value == int(value) else value
+
+
+def _single(values):
+    """The value if all matches agree, None if there are none or they conflict."""
+    distinct = list(dict.fromkeys(value for value in values if value is not None))
+    return distinct[0] if len(distinct) == 1 else None
+
+
+class LookupMatchers:
+    """Whole-word, case-insensitive matchers compiled from the DB lookup tables."""
+
+    def __init__(self, industries=(), source_types=(), technologies=()):
+        self.industry = self._compile(industries)
+        self.source_type = self._compile(source_types)
+        self.categories = {name.lower(): category for name, category in technologies}
+        self.technology = self._compile([name for name, _ in technologies])
+        self.names = {name.lower(): name for name in [*industries, *source_types, *(name for name, _ in technologies)]}
+
+    @staticmethod
+    def _compile(names):
+        names = sorted({name for name in names if name and len(name) >= MIN_NAME_LENGTH}, key=len, reverse=True)
+        if not names:
+            return None
+        return re.compile(r"(?<!\w)(?:" + "|".join(re.escape(name) for name in names) + r")(?!\w)", re.IGNORECASE)
+
+    def find(self, matcher, text):
+        if matcher is None:
+            return []
+        return list(dict.fromkeys(self.names[match.group(0).lower()] for match in matcher.finditer(text)))
+
+
+_matchers = {}
+_lock = threading.Lock()
+
+
+def load_matchers(database_path='my_DB.db'):
+    """Matchers for the lookup tables, recompiled only when a table has changed."""
+    conn = sqlite3.connect(database_path)
+    try:
+        version = conn.execute('''
+        SELECT (SELECT COUNT(*) || ':' || IFNULL(MAX(IndustryID), 0) FROM Industry),
+               (SELECT COUNT(*) || ':' || IFNULL(MAX(SourceTypeID), 0) FROM SourceType),
+               (SELECT COUNT(*) || ':' || IFNULL(MAX(TechID), 0) FROM TechnologyStack)
+        ''').fetchone()
+        with _lock:
+            cached = _matchers.get(database_path)
+            if cached and cached[0] == version:
+                return cached[1]
+            matchers = LookupMatchers(
+                [name for (name,) in conn.execute("SELECT IndustryName FROM Industry")],
+                [name for (name,) in conn.execute("SELECT SourceTypeName FROM SourceType")],
+                conn.execute("SELECT TechName, Category FROM TechnologyStack").fetchall(),
+            )
+            _matchers[database_path] = (version, matchers)
+            return matchers
+    except sqlite3.Error as e:
+        print(f"Lookup tables unavailable for pre-extraction: {e}")
+        return LookupMatchers()
+    finally:
+        conn.close()
+
+
+def pre_extract(text, matchers=None):
+    """High-confidence values found in a dump, in the shape of the extracted JSON (empty sections left out)."""
+    matchers = matchers or LookupMatchers()
+    client, project, interaction = {}, {}, {}
+
+    client["ContactEmail"] = _single(match.lower() for match in EMAIL.findall(text))
+    # Date-like digit runs are not phone numbers
+    phones = [match.group(0).strip() for match in PHONE.finditer(text)
+              if len(re.sub(r"\D", "", match.group(0))) >= 10 and not DATE.fullmatch(match.group(0).strip())]
+    client["ContactNumber"] = _single(phones)
+    client["IndustryID"] = _single(matchers.find(matchers.industry, text))
+
+    project["StartDate"] = _single(parse_date(match.group(1)) for match in START_DATE.finditer(text))
+    project["EndDate"] = _single(parse_date(match.group(1)) for match in END_DATE.finditer(text))
+    budgets = [parse_amount(match.group(2), match.group(3)) for match in BUDGET.finditer(text)]
+    if not budgets:
+        # Without a "budget" keyword, only a single amount of money in the whole dump counts
+        amounts = [parse_amount(number, unit) for _, number, unit in MONEY.findall(text)]
+        budgets = amounts if len(amounts) == 1 else []
+    project["Budget"] = _single(budgets)
+    project["NumUsers"] = _single(int(number.replace(",", "")) for number in NUM_USERS.findall(text))
+
+    interaction["SourceTypeID"] = _single(matchers.find(matchers.source_type, text))
+    technologies = [{"TechName": name, "Category": matchers.categories.get(name.lower())}
+                    for name in matchers.find(matchers.technology, text)]
+
+    found = {}
+    for section, values in (("Clients", client), ("Project", project), ("Interaction", interaction)):
+        values = {field: value for field, value in values.items() if value is not None}
+        if values:
+            found[section] = values
+    if technologies:
+        found["ProjectTechnology"] = technologies
+    return found
+
+
+def filled_fields(found):
+    return {field for section in found.values() if isinstance(section, dict) for field in section}
+
+
+def field_name(line):
+    """Normalised field named by a MISSING DATA line, e.g. "1. Clients.Contact Email:" -> "contactemail"."""
+    name = re.sub(r"^\s*(?:[-*\u2022]|\d+[.)])?\s*", "", line).strip().strip("`'\"").rstrip(".:;")
+    return SECTION_PREFIX.sub("", re.sub(r"[\s_`'\"]", "", name).lower())
+
+
+def drop_filled(missing_fields, found):
+    """Remove MISSING DATA lines that name nothing but a field the pre-extractor filled.
+
+    Lines mentioning anything else, and all clarification questions, are left to the LLM.
+    """
+    names = {name for field in filled_fields(found) for name in FIELD_NAMES.get(field, ())}
+    return [line for line in missing_fields if field_name(line) not in names]
+
+
+def merge_into(extracted, found):
+    """Fill fields the LLM left empty with pre-extracted values; values the LLM gave are kept."""
+    for section in ("Clients", "Project"):
+        if section in found:
+            target = extracted.setdefault(section, {})
+            if isinstance(target, dict):
+                for field, value in found[section].items():
+                    if target.get(field) in (None, "", "null", "Null"):
+                        target[field] = value
+    return extracted
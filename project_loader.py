@@ -0,0 +1,168 @@
+import json
+import sqlite3
+import argparse
+
+from tracing import trace_stage
+from transcripts import decompress
+
+# Rebuilds the nested project JSON that Rag_to_DB.main accepts from the database.
+# Every request uses the same five set-based queries, however many projects,
+# requirements or interactions it covers: projects, technologies, requirements,
+# constraints and the transcripts they reference.
+
+PROJECTS_QUERY = '''
+SELECT Project.ProjectID, Clients.ClientName, Clients.ContactEmail, Clients.ContactNumber, Clients.Location,
+       Industry.IndustryName, Project.ProjectName, Project.StartDate, Project.EndDate, Project.NumUsers,
+       Project.ProjectStatus, Project.Budget, Project.DeliveryModel
+FROM Project
+LEFT JOIN Clients ON Clients.ClientID = Project.ClientID
+LEFT JOIN Industry ON Industry.IndustryID = Clients.IndustryID
+WHERE Project.ProjectID IN (SELECT value FROM json_each(?))
+'''
+
+TECHNOLOGY_QUERY = '''
+SELECT ProjectTechnology.ProjectID, TechnologyStack.TechName, ProjectTechnology.Status, TechnologyStack.Category
+FROM ProjectTechnology
+JOIN TechnologyStack ON TechnologyStack.TechID = ProjectTechnology.TechID
+WHERE ProjectTechnology.ProjectID IN (SELECT value FROM json_each(?))
+ORDER BY ProjectTechnology.ProjectID, ProjectTechnology.rowid
+'''
+
+INTERACTION_COLUMNS = '''
+       InteractionLog.Timestamp, SourceType.SourceTypeName, InteractionLog.RawTextHash, InteractionLog.RawText,
+       InteractionLog.ExtractedSummary'''
+
+REQUIREMENTS_QUERY = f'''
+SELECT Requirements.ProjectID,
+       CASE Requirements.Type WHEN 1 THEN 'Functional' WHEN 0 THEN 'Non-functional' END AS Type,
+       Requirements.Description, Requirements.Status, Requirements.PriorityType,
+       RequirementCategories.RequirementCategoryName, {INTERACTION_COLUMNS}
+FROM Requirements
+LEFT JOIN RequirementCategories
+  ON RequirementCategories.RequirementCategoryID = Requirements.RequirementCategoryID
+LEFT JOIN InteractionLog ON InteractionLog.InteractionID = Requirements.InteractionID
+LEFT JOIN SourceType ON SourceType.SourceTypeID = InteractionLog.SourceTypeID
+WHERE Requirements.ProjectID IN (SELECT value FROM json_each(?))
+ORDER BY Requirements.ProjectID, Requirements.RequirementID
+'''
+
+CONSTRAINTS_QUERY = f'''
+SELECT Constraints.ProjectID, ConstraintType.ConstraintTypeName, Constraints.Description, Constraints.Severity,
+       {INTERACTION_COLUMNS}
+FROM Constraints
+LEFT JOIN ConstraintType ON ConstraintType.ConstraintTypeID = Constraints.ConstraintTypeID
+LEFT JOIN InteractionLog ON InteractionLog.InteractionID = Constraints.InteractionID
+LEFT JOIN SourceType ON SourceType.SourceTypeID = InteractionLog.SourceTypeID
+WHERE Constraints.ProjectID IN (SELECT value FROM json_each(?))
+ORDER BY Constraints.ProjectID, Constraints.ConstraintID
+'''
+
+TRANSCRIPTS_QUERY = '''
+SELECT Hash, Codec, Data FROM TranscriptBlob
+WHERE Hash IN (
+    SELECT InteractionLog.RawTextHash FROM InteractionLog
+    JOIN Requirements ON Requirements.InteractionID = InteractionLog.InteractionID
+    WHERE Requirements.ProjectID IN (SELECT value FROM json_each(?1))
+    UNION
+    SELECT InteractionLog.RawTextHash FROM InteractionLog
+    JOIN Constraints ON Constraints.InteractionID = InteractionLog.InteractionID
+    WHERE Constraints.ProjectID IN (SELECT value FROM json_each(?1)))
+'''
+
+
+def _timestamp(value):
+    # Interactions are stored as dates; add_Interaction_Log expects "%Y-%m-%dT%H:%M:%S"
+    if isinstance(value, str) and len(value) == 10:
+        return value + "T00:00:00"
+    return value
+
+
+def _interaction(row, transcripts):
+    Timestamp, SourceTypeName, RawTextHash, RawText, ExtractedSummary = row
+    return {
+        "Timestamp": _timestamp(Timestamp),
+        "SourceTypeID": SourceTypeName,
+        "RawText": transcripts.get(RawTextHash) if RawTextHash else RawText,
+        "ExtractedSummary": ExtractedSummary,
+    }
+
+
+def load_projects(ProjectIDs, database_path='my_DB.db'):
+    """Rebuild the nested Clients/Project/ProjectTechnology/Requirements/Constraints JSON of several projects.
+
+    Returns {ProjectID: data}; unknown IDs are left out.
+    """
+    ids = json.dumps([int(ProjectID) for ProjectID in ProjectIDs])
+    conn = sqlite3.connect(database_path)
+    cursor = conn.cursor()
+    try:
+        with trace_stage("db.load_projects") as span:
+            # One read transaction, so the five queries see the same snapshot
+            cursor.execute("BEGIN")
+            projects = {}
+            for row in cursor.execute(PROJECTS_QUERY, (ids,)):
+                projects[row[0]] = {
+                    "Clients": {
+                        "ClientName": row[1],
+                        "ContactEmail": row[2],
+                        "ContactNumber": row[3],
+                        "Location": row[4],
+                        "IndustryID": row[5],
+                    },
+                    "Project": {
+                        "ProjectName": row[6],
+                        "StartDate": row[7],
+                        "EndDate": row[8],
+                        "NumUsers": row[9],
+                        "ProjectStatus": row[10],
+                        "Budget": row[11],
+                        "DeliveryModel": row[12],
+                    },
+                    "Requirements": [],
+                    "Constraints": [],
+                    "ProjectTechnology": [],
+                }
+
+            for ProjectID, TechName, Status, Category in cursor.execute(TECHNOLOGY_QUERY, (ids,)).fetchall():
+                projects[ProjectID]["ProjectTechnology"].append(
+                    {"TechName": TechName, "Status": Status, "Category": Category})
+
+            requirements = cursor.execute(REQUIREMENTS_QUERY, (ids,)).fetchall()
+            constraints = cursor.execute(CONSTRAINTS_QUERY, (ids,)).fetchall()
+            transcripts = {Hash: decompress(Codec, Data)
+                           for Hash, Codec, Data in cursor.execute(TRANSCRIPTS_QUERY, (ids,))}
+            conn.rollback()
+
+            for row in requirements:
+                projects[row[0]]["Requirements"].append({
+                    "InteractionID": _interaction(row[6:], transcripts),
+                    "Type": row[1],
+                    "Description": row[2],
+                    "Status": row[3],
+                    "PriorityType": row[4],
+                    "RequirementCategoryID": row[5],
+                })
+            for row in constraints:
+                projects[row[0]]["Constraints"].append({
+                    "ConstraintTypeID": row[1],
+                    "Description": row[2],
+                    "Severity": row[3],
+                    "InteractionID": _interaction(row[4:], transcripts),
+                })
+            span["rows"] = len(projects) + len(requirements) + len(constraints)
+        return projects
+    finally:
+        conn.close()
+
+
+def load_project(ProjectID, database_path='my_DB.db'):
+    """Nested JSON of one stored project (None if it does not exist)."""
+    return load_projects([ProjectID], database_path).get(int(ProjectID))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print the stored JSON of one or more projects.")
+    parser.add_argument("projects", nargs="+", type=int, help="Project IDs")
+    parser.add_argument("--db", default="my_DB.db")
+    args = parser.parse_args()
+    print(json.dumps(load_projects(args.projects, args.db), indent=2, default=str))
@@ -0,0 +1,143 @@
+import time
+import hashlib
+import threading
+from langchain_core.messages import HumanMessage
+from rate_limit import is_retryable
+
+try:
+    from google import genai
+    from google.genai import types
+except ImportError:
+    genai = None
+
+# Provider caches are refreshed a little before they expire
+CACHE_TTL_SECONDS = 3600
+REFRESH_MARGIN_SECONDS = 60
+
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token) used when the provider reports none."""
+    return max(1, len(text) // 4) if text else 0
+
+
+def prefix_key(prefix):
+    return hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+
+
+def send_full_prompt(llm, prefix, suffix):
+    return llm.invoke([HumanMessage(content=prefix + suffix)])
+
+
+class UncachedPrompts:
+    """Sends every prompt in full and reports no cached tokens; used when provider caching is unavailable."""
+
+    def invoke(self, llm, prefix, suffix):
+        """Return (response, cached prompt tokens)."""
+        return send_full_prompt(llm, prefix, suffix), 0
+
+
+class LocalPrefixCache:
+    """Local stand-in for provider-side prompt caching.
+
+    Prompts are split into a static prefix (the prompt template) and a variable
+    suffix (KB context, dump, extracted data). The full prompt is still sent,
+    but the first call for a prefix warms it and later calls report the prefix
+    tokens as cached, the way a provider cache would. Only for tests and local
+    experiments: nothing is actually cached, so it must not back real traffic.
+    """
+
+    def __init__(self):
+        self.warm = set()
+        self.lock = threading.Lock()
+
+    def invoke(self, llm, prefix, suffix):
+        """Return (response, cached prompt tokens)."""
+        key = prefix_key(prefix)
+        with self.lock:
+            cached = key in self.warm
+            self.warm.add(key)
+        return send_full_prompt(llm, prefix, suffix), estimate_tokens(prefix) if cached else 0
+
+
+class GeminiContextCache(LocalPrefixCache):
+    """Gemini context caching: each static prefix is uploaded once as cached content.
+
+    Later calls only send the suffix and reference the cache by name. Prefixes
+    the provider refuses to cache (e.g. below its minimum size) fall back to
+    sending the full prompt.
+    """
+
+    def __init__(self, api_key, model):
+        super().__init__()
+        self.client = genai.Client(api_key=api_key)
+        self.model = model
+        # prefix key -> (cache name or None if the provider refused it, expiry time)
+        self.caches = {}
+        # prefix key -> lock held while that prefix's cache is created
+        self.creating = {}
+
+    def _cached(self, key):
+        with self.lock:
+            name, expires = self.caches.get(key, (None, 0))
+            return time.time() < expires, name
+
+    def cache_name(self, prefix):
+        key = prefix_key(prefix)
+        fresh, name = self._cached(key)
+        if fresh:
+            return name
+        with self.lock:
+            guard = self.creating.setdefault(key, threading.Lock())
+
+        # Only calls for this prefix wait for the provider; other prefixes and cached calls go ahead
+        with guard:
+            fresh, name = self._cached(key)
+            if fresh:
+                return name
+            try:
+                cache = self.client.caches.create(
+                    model=self.model,
+                    config=types.CreateCachedContentConfig(
+                        contents=[types.Content(role="user", parts=[types.Part(text=prefix)])],
+                        ttl=f"{CACHE_TTL_SECONDS}s",
+                        display_name=f"trackbot-{key[:12]}",
+                    ),
+                )
+                name = cache.name
+            except Exception as e:
+                print(f"Prompt prefix not cached by provider: {e}")
+                name = None
+            with self.lock:
+                self.caches[key] = (name, time.time() + CACHE_TTL_SECONDS - REFRESH_MARGIN_SECONDS)
+            return name
+
+    def invoke(self, llm, prefix, suffix):
+        name = self.cache_name(prefix)
+        if name is None:
+            # Nothing is cached on the provider side, so no tokens are reported as cached
+            return send_full_prompt(llm, prefix, suffix), 0
+        try:
+            response = llm.invoke([HumanMessage(content=suffix)], cached_content=name)
+        except Exception as e:
+            if is_retryable(e):
+                # Quota/overload errors are retried by the caller's rate limiter
+                raise
+            # The cache may have been evicted early; drop it and send the whole prompt
+            print(f"Cached prompt call failed, retrying uncached: {e}")
+            with self.lock:
+                self.caches.pop(prefix_key(prefix), None)
+            return send_full_prompt(llm, prefix, suffix), 0
+
+        usage = getattr(response, "usage_metadata", None) or {}
+        cached_tokens = (usage.get("input_token_details") or {}).get("cache_read")
+        return response, cached_tokens if cached_tokens is not None else estimate_tokens(prefix)
+
+
+def create_prompt_cache(api_key=None, model=None):
+    """Provider caching when the google-genai SDK is installed, plain uncached calls otherwise."""
+    if genai is not None and api_key and model:
+        try:
+            return GeminiContextCache(api_key, model)
+        except Exception as e:
+            print(f"Gemini context caching unavailable: {e}")
+    return UncachedPrompts()
@@ -0,0 +1,226 @@
+import time
+import heapq
+import random
+import argparse
+import threading
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+# Defaults match the Gemini 2.0 Flash free tier; override in secrets.toml
+REQUESTS_PER_MINUTE = 15
+TOKENS_PER_MINUTE = 1000000
+MAX_CONCURRENT = 4
+MAX_RETRIES = 5
+BASE_DELAY = 1.0
+MAX_DELAY = 60.0
+# Share of the per-minute budget that may be spent in a burst; the rest is
+# refilled steadily, so no 60-second window ever exceeds the quota
+BURST_FRACTION = 0.1
+
+# Lower value is served first
+INTERACTIVE = 0
+BACKGROUND = 1
+
+
+class TokenBucket:
+    """Allows per_minute units per period: a burst of up to burst_fraction of them, the rest at a steady rate.
+
+    period is a minute; tests shorten it to run against StubLLM in seconds.
+    """
+
+    def __init__(self, per_minute, burst_fraction=BURST_FRACTION, period=60):
+        self.capacity = max(1, int(per_minute * burst_fraction))
+        self.rate = max(1, per_minute - self.capacity) / period
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until amount units are available (amounts above capacity only wait for a full bucket)."""
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+
+def is_retryable(error):
+    """Quota, overload and timeout errors are retried; anything else is raised at once."""
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if code in (429, 500, 502, 503, 504):
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in
+               ("429", "resource_exhausted", "resource exhausted", "quota", "rate limit",
+                "503", "unavailable", "overloaded", "deadline", "timed out"))
+
+
+def backoff_delay(attempt, base=BASE_DELAY, cap=MAX_DELAY):
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class RateLimiter:
+    """Shared client-side limiter for LLM calls.
+
+    Requests and tokens per minute are token buckets; at most max_concurrent
+    calls run at once. Waiting callers are served by priority (INTERACTIVE
+    before BACKGROUND), then in arrival order. Token costs are reserved from
+    an estimate and corrected with the usage the provider reports. A quota
+    error pauses every caller for the backoff delay, so the limiter settles
+    just under the provider's ceiling instead of repeatedly hitting it.
+    """
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE,
+                 max_concurrent=MAX_CONCURRENT, max_retries=MAX_RETRIES, base_delay=BASE_DELAY, max_delay=MAX_DELAY,
+                 period=60):
+        self.requests = TokenBucket(requests_per_minute, period=period)
+        self.tokens = TokenBucket(tokens_per_minute, period=period)
+        self.max_concurrent = max_concurrent
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.running = 0
+        self.paused_until = 0.0
+        self.waiting = []
+        self.order = itertools.count()
+        self.condition = threading.Condition()
+        self.stats = {"calls": 0, "retries": 0, "failures": 0, "queued_seconds": 0.0}
+
+    def acquire(self, tokens, priority=INTERACTIVE):
+        """Block until this caller is first in line and within every limit; returns seconds waited."""
+        start = time.monotonic()
+        ticket = (priority, next(self.order))
+        with self.condition:
+            heapq.heappush(self.waiting, ticket)
+            while True:
+                now = time.monotonic()
+                self.requests.refill(now)
+                self.tokens.refill(now)
+                if self.waiting[0] == ticket and self.running < self.max_concurrent:
+                    wait = max(self.paused_until - now, self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                    if wait <= 0:
+                        break
+                else:
+                    wait = None
+                self.condition.wait(wait)
+
+            heapq.heappop(self.waiting)
+            self.requests.level -= 1
+            self.tokens.level -= tokens
+            self.running += 1
+            self.condition.notify_all()
+        return time.monotonic() - start
+
+    def release(self, reserved, used=None):
+        """Free the concurrency slot and correct the token reservation with the actual usage."""
+        with self.condition:
+            self.running -= 1
+            if used is not None:
+                self.tokens.level += reserved - used
+            self.condition.notify_all()
+
+    def pause(self, seconds):
+        with self.condition:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.condition.notify_all()
+
+    def call(self, func, tokens, priority=INTERACTIVE, usage=None, span=None):
+        """Run func() under the limits, retrying quota/overload errors with jittered backoff.
+
+        usage is an optional callable mapping func's result to the tokens it
+        actually used. span (a trace dict) receives the queue time and retries.
+        """
+        queued = 0.0
+        for attempt in range(self.max_retries + 1):
+            queued += self.acquire(tokens, priority)
+            if span is not None:
+                span["queued_seconds"] = round(queued, 6)
+                span["retries"] = attempt
+            used = None
+            try:
+                result = func()
+                used = usage(result) if usage else None
+                self._count("calls", queued_seconds=queued)
+                return result
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    self._count("failures")
+                    raise
+                delay = backoff_delay(attempt, self.base_delay, self.max_delay)
+                print(f"LLM call failed ({e}), retrying in {delay:.1f}s")
+                self._count("retries")
+                self.pause(delay)
+            finally:
+                self.release(tokens, used)
+
+    def _count(self, key, queued_seconds=0.0):
+        with self.condition:
+            self.stats[key] += 1
+            self.stats["queued_seconds"] += queued_seconds
+
+
+class StubLLM:
+    """Local stand-in for the provider: enforces its own quota per period (a minute) and raises 429s above it."""
+
+    class QuotaError(Exception):
+        code = 429
+
+    def __init__(self, requests_per_minute, latency=0.2, period=60):
+        self.requests_per_minute = requests_per_minute
+        self.latency = latency
+        self.period = period
+        self.calls = []
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    def invoke(self, prompt):
+        with self.lock:
+            now = time.monotonic()
+            self.calls = [t for t in self.calls if now - t < self.period]
+            if len(self.calls) >= self.requests_per_minute:
+                self.rejected += 1
+                raise self.QuotaError("429 RESOURCE_EXHAUSTED: quota exceeded")
+            self.calls.append(now)
+        time.sleep(self.latency)
+        return prompt
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drive the rate limiter against a local stub LLM with a fixed quota.")
+    parser.add_argument("--quota", type=int, default=60, help="Stub requests per minute")
+    parser.add_argument("--limit", type=int, help="Limiter requests per minute (default: the stub quota)")
+    parser.add_argument("--calls", type=int, default=90)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--no-limiter", action="store_true", help="Call the stub directly with plain retries")
+    args = parser.parse_args()
+
+    stub = StubLLM(args.quota)
+    limiter = RateLimiter(requests_per_minute=args.limit or args.quota, max_concurrent=args.threads,
+                          max_retries=8, max_delay=10)
+    done_at = {}
+
+    def job(number):
+        priority = INTERACTIVE if number % 3 == 0 else BACKGROUND
+        if args.no_limiter:
+            for attempt in range(9):
+                try:
+                    stub.invoke("hello")
+                    break
+                except StubLLM.QuotaError:
+                    time.sleep(backoff_delay(attempt, cap=10))
+        else:
+            limiter.call(lambda: stub.invoke("hello"), tokens=10, priority=priority)
+        done_at[number] = time.monotonic()
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(args.threads) as pool:
+        list(pool.map(job, range(args.calls)))
+    elapsed = time.monotonic() - start
+
+    interactive = [done_at[n] - start for n in done_at if n % 3 == 0]
+    background = [done_at[n] - start for n in done_at if n % 3]
+    print(f"{args.calls} calls in {elapsed:.1f}s ({60 * args.calls / elapsed:.1f}/min against a quota of {args.quota}/min)")
+    print(f"quota errors from the stub: {stub.rejected}")
+    print(f"mean finish time: interactive {sum(interactive) / len(interactive):.1f}s, "
+          f"background {sum(background) / len(background):.1f}s")
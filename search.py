@@ -0,0 +1,222 @@
+import re
+import sqlite3
+from transcripts import interaction_raw_text
+
+# FTS5 indexes over the free-text columns. Requirements and constraints use
+# external-content tables kept in sync by triggers. Transcripts live compressed
+# in TranscriptBlob, so InteractionFTS is contentless and filled by the write
+# path (index_interaction); its snippets are built here from the stored text.
+FTS_TABLES = {
+    "RequirementsFTS": ("Requirements", "RequirementID", ["Description"]),
+    "ConstraintsFTS": ("Constraints", "ConstraintID", ["Description"]),
+}
+INTERACTION_FTS = "InteractionFTS"
+
+
+def create_search_index(cursor):
+    """Create the FTS5 tables and the triggers that keep them in sync."""
+    for fts_table, (table, key, columns) in FTS_TABLES.items():
+        column_list = ", ".join(columns)
+        new_values = ", ".join(f"new.{column}" for column in columns)
+        old_values = ", ".join(f"old.{column}" for column in columns)
+
+        cursor.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5(
+            {column_list}, content='{table}', content_rowid='{key}', tokenize='porter unicode61')
+        ''')
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_insert AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts_table} (rowid, {column_list}) VALUES (new.{key}, {new_values});
+        END
+        ''')
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_delete AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts_table} ({fts_table}, rowid, {column_list}) VALUES ('delete', old.{key}, {old_values});
+        END
+        ''')
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_update AFTER UPDATE ON {table} BEGIN
+            INSERT INTO {fts_table} ({fts_table}, rowid, {column_list}) VALUES ('delete', old.{key}, {old_values});
+            INSERT INTO {fts_table} (rowid, {column_list}) VALUES (new.{key}, {new_values});
+        END
+        ''')
+
+    cursor.execute(f'''
+    CREATE VIRTUAL TABLE IF NOT EXISTS {INTERACTION_FTS} USING fts5(
+        RawText, ExtractedSummary, content='', tokenize='porter unicode61')
+    ''')
+
+
+def index_interaction(cursor, InteractionID, RawText, ExtractedSummary):
+    """Add a newly inserted interaction to the contentless transcript index."""
+    cursor.execute(f"INSERT INTO {INTERACTION_FTS} (rowid, RawText, ExtractedSummary) VALUES (?, ?, ?)",
+                   (InteractionID, RawText, ExtractedSummary))
+
+
+def drop_legacy_interaction_index(cursor):
+    """Remove the trigger-synced InteractionFTS used before transcripts were compressed."""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?", (f"{INTERACTION_FTS}_insert",))
+    if cursor.fetchone():
+        for action in ("insert", "delete", "update"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {INTERACTION_FTS}_{action}")
+        cursor.execute(f"DROP TABLE IF EXISTS {INTERACTION_FTS}")
+        return True
+    return False
+
+
+def rebuild_search_index(database_path='my_DB.db'):
+    """Create the FTS5 tables if needed and backfill them from the base tables."""
+    conn = sqlite3.connect(database_path)
+    cursor = conn.cursor()
+    drop_legacy_interaction_index(cursor)
+    create_search_index(cursor)
+    for fts_table in FTS_TABLES:
+        cursor.execute(f"INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild')")
+
+    cursor.execute(f"INSERT INTO {INTERACTION_FTS} ({INTERACTION_FTS}) VALUES ('delete-all')")
+    for InteractionID, ExtractedSummary in cursor.execute(
+            "SELECT InteractionID, ExtractedSummary FROM InteractionLog").fetchall():
+        index_interaction(cursor, InteractionID, interaction_raw_text(cursor, InteractionID), ExtractedSummary)
+    conn.commit()
+    conn.close()
+
+
+def ensure_search_index(database_path='my_DB.db'):
+    """Migrate an existing database: build the search index once."""
+    conn = sqlite3.connect(database_path)
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")}
+    conn.close()
+    legacy = f"{INTERACTION_FTS}_insert" in existing
+    if legacy or not set(FTS_TABLES) | {INTERACTION_FTS} <= existing:
+        rebuild_search_index(database_path)
+
+
+def make_snippet(text, words, width=16):
+    """Highlight the first window of text containing one of the search words."""
+    # Trim word endings a little so stemmed matches ("ticketing" -> "ticket") are highlighted too
+    prefixes = [word.lower()[:max(4, len(word) - 3)] for word in words]
+
+    def matches(token):
+        return any(token.lower().strip(".,;:!?()\"'").startswith(prefix) for prefix in prefixes)
+
+    tokens = (text or "").split()
+    for position, token in enumerate(tokens):
+        if matches(token):
+            start = max(0, position - width // 2)
+            window = [f"**{token}**" if matches(token) else token for token in tokens[start:start + width]]
+            return ("…" if start > 0 else "") + " ".join(window) + ("…" if start + width < len(tokens) else "")
+    return None
+
+
+def to_match_query(text):
+    """Turn free user input into a safe FTS5 query (all words, prefix match)."""
+    words = re.findall(r"\w+", text)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search(text, ClientName=None, ProjectID=None, date_from=None, date_to=None,
+           kinds=("Requirement", "Constraint", "Interaction"), limit=20, database_path='my_DB.db'):
+    """Ranked full-text search with snippets over requirements, constraints and transcripts.
+
+    Dates are compared against InteractionLog.Timestamp ("YYYY-MM-DD").
+    Returns a list of dicts ordered by bm25 rank (best first).
+    """
+    match = to_match_query(text)
+    if not match:
+        return []
+
+    filters = (ClientName, ClientName, ProjectID, ProjectID, date_from, date_from, date_to, date_to)
+    project_filter = '''
+        AND (? IS NULL OR Clients.ClientName = ?)
+        AND (? IS NULL OR Project.ProjectID = ?)
+        AND (? IS NULL OR InteractionLog.Timestamp >= ?)
+        AND (? IS NULL OR InteractionLog.Timestamp <= ?)
+    '''
+
+    queries = []
+    params = []
+    if "Requirement" in kinds:
+        queries.append(f'''
+        SELECT 'Requirement' AS Kind, Requirements.RequirementID AS ID, Project.ProjectName AS Project,
+               Clients.ClientName AS Client, InteractionLog.Timestamp AS Date,
+               snippet(RequirementsFTS, 0, '**', '**', '…', 16) AS Snippet,
+               bm25(RequirementsFTS) AS Rank
+        FROM RequirementsFTS
+        JOIN Requirements ON Requirements.RequirementID = RequirementsFTS.rowid
+        LEFT JOIN Project ON Project.ProjectID = Requirements.ProjectID
+        LEFT JOIN Clients ON Clients.ClientID = Project.ClientID
+        LEFT JOIN InteractionLog ON InteractionLog.InteractionID = Requirements.InteractionID
+        WHERE RequirementsFTS MATCH ? {project_filter}
+        ''')
+        params += [match, *filters]
+
+    if "Constraint" in kinds:
+        queries.append(f'''
+        SELECT 'Constraint' AS Kind, Constraints.ConstraintID AS ID, Project.ProjectName AS Project,
+               Clients.ClientName AS Client, InteractionLog.Timestamp AS Date,
+               snippet(ConstraintsFTS, 0, '**', '**', '…', 16) AS Snippet,
+               bm25(ConstraintsFTS) AS Rank
+        FROM ConstraintsFTS
+        JOIN Constraints ON Constraints.ConstraintID = ConstraintsFTS.rowid
+        LEFT JOIN Project ON Project.ProjectID = Constraints.ProjectID
+        LEFT JOIN Clients ON Clients.ClientID = Project.ClientID
+        LEFT JOIN InteractionLog ON InteractionLog.InteractionID = Constraints.InteractionID
+        WHERE ConstraintsFTS MATCH ? {project_filter}
+        ''')
+        params += [match, *filters]
+
+    if "Interaction" in kinds:
+        # An interaction can feed several projects; keep one row per transcript.
+        # The hits are materialized first because bm25 cannot run inside GROUP BY.
+        # Snippet holds the summary here and is replaced below.
+        queries.append(f'''
+        SELECT * FROM (
+        WITH Hits AS MATERIALIZED (
+            SELECT rowid AS InteractionID, bm25({INTERACTION_FTS}) AS Rank
+            FROM {INTERACTION_FTS} WHERE {INTERACTION_FTS} MATCH ?
+        )
+        SELECT 'Interaction' AS Kind, Hits.InteractionID AS ID, MIN(Project.ProjectName) AS Project,
+               MIN(Clients.ClientName) AS Client, InteractionLog.Timestamp AS Date,
+               InteractionLog.ExtractedSummary AS Snippet, Hits.Rank AS Rank
+        FROM Hits
+        JOIN InteractionLog ON InteractionLog.InteractionID = Hits.InteractionID
+        LEFT JOIN (
+            SELECT InteractionID, ProjectID FROM Requirements
+            UNION SELECT InteractionID, ProjectID FROM Constraints
+        ) AS Links ON Links.InteractionID = Hits.InteractionID
+        LEFT JOIN Project ON Project.ProjectID = Links.ProjectID
+        LEFT JOIN Clients ON Clients.ClientID = Project.ClientID
+        WHERE 1 = 1 {project_filter}
+        GROUP BY Hits.InteractionID)
+        ''')
+        params += [match, *filters]
+
+    if not queries:
+        return []
+
+    query = " UNION ALL ".join(queries) + " ORDER BY Rank LIMIT ?"
+    params.append(limit)
+
+    conn = sqlite3.connect(database_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        rows = [dict(row) for row in conn.execute(query, params).fetchall()]
+        # Transcripts are only decompressed when the summary does not contain a match
+        words = re.findall(r"\w+", text)
+        for row in rows:
+            if row["Kind"] == "Interaction":
+                row["Snippet"] = (make_snippet(row["Snippet"], words)
+                                  or make_snippet(interaction_raw_text(conn.cursor(), row["ID"]), words)
+                                  or row["Snippet"])
+    except sqlite3.Error as e:
+        print(f"Search error: {e}")
+        rows = []
+    conn.close()
+    return rows
+
+
+def list_clients(database_path='my_DB.db'):
+    conn = sqlite3.connect(database_path)
+    names = [row[0] for row in conn.execute("SELECT ClientName FROM Clients ORDER BY ClientName")]
+    conn.close()
+    return names
@@ -0,0 +1,223 @@
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+# Messages per channel kept in memory; older ones are only kept on disk
+MAX_MESSAGES_IN_MEMORY = 40
+SESSION_DB = "sessions.db"
+# Whole sessions kept in memory by the persistent store; least recently used
+# and idle ones are dropped and reloaded from SQLite on their next request
+MAX_SESSIONS_IN_MEMORY = 1000
+SESSION_IDLE_SECONDS = 1800
+MAX_SESSION_MEMORY_MB = 256
+
+
+class SessionStore:
+    """In-memory session store holding a bounded working set per session.
+
+    Each session has message channels (e.g. "messages") and a small state
+    dict. Only the last max_messages of each channel stay in memory. This base
+    class keeps nothing beyond that working set; SQLiteSessionStore adds
+    persistence so older messages and whole sessions survive a restart.
+
+    With max_sessions, idle_seconds or max_memory_mb set, whole sessions are
+    dropped from memory, least recently used first, when there are too many,
+    they have been idle too long or all sessions together exceed the memory
+    cap. Only a persistent store should set them: a dropped session is
+    reloaded with _load on its next request.
+    """
+
+    def __init__(self, max_messages=MAX_MESSAGES_IN_MEMORY, max_sessions=None, idle_seconds=None, max_memory_mb=None):
+        self.max_messages = max_messages
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.max_bytes = max_memory_mb * 1024 * 1024 if max_memory_mb else None
+        self.sessions = OrderedDict()   # session id -> session, least recently used first
+        self.sizes = {}                 # session id -> approximate bytes in memory
+        self.used = {}                  # session id -> time of last request
+        self.lock = threading.Lock()
+
+    def _session(self, session_id):
+        if session_id not in self.sessions:
+            self.sessions[session_id] = self._load(session_id)
+            self.sizes[session_id] = self._size(self.sessions[session_id])
+        self.sessions.move_to_end(session_id)
+        self.used[session_id] = time.monotonic()
+        self._evict(keep=session_id)
+        return self.sessions[session_id]
+
+    def _resized(self, session_id):
+        self.sizes[session_id] = self._size(self.sessions[session_id])
+        self._evict(keep=session_id)
+
+    def _evict(self, keep):
+        now = time.monotonic()
+        for session_id in list(self.sessions):
+            if session_id == keep:
+                continue
+            if not ((self.max_sessions and len(self.sessions) > self.max_sessions)
+                    or (self.max_bytes and sum(self.sizes.values()) > self.max_bytes)
+                    or (self.idle_seconds and now - self.used[session_id] > self.idle_seconds)):
+                break
+            del self.sessions[session_id], self.sizes[session_id], self.used[session_id]
+
+    @staticmethod
+    def _size(session):
+        size = sum(len(message.get("content", "")) + len(message.get("role", ""))
+                   for messages in session["messages"].values() for message in messages)
+        return size + len(json.dumps(session["state"], default=str))
+
+    # Persistence hooks, no-ops for the in-memory store
+    def _load(self, session_id):
+        return {"messages": {}, "state": {}, "spilled": {}}
+
+    def _save_message(self, session_id, channel, message):
+        pass
+
+    def _save_state(self, session_id, state):
+        pass
+
+    def _delete(self, session_id, channels):
+        pass
+
+    def _read_all(self, session_id, channel):
+        return []
+
+    def recent_messages(self, session_id, channel):
+        """The in-memory working set for a channel (a list shared with the caller)."""
+        with self.lock:
+            return self._session(session_id)["messages"].setdefault(channel, [])
+
+    def append_message(self, session_id, channel, message):
+        """Append a message, persist it and trim the in-memory working set in place."""
+        with self.lock:
+            session = self._session(session_id)
+            messages = session["messages"].setdefault(channel, [])
+            messages.append(message)
+            self._save_message(session_id, channel, message)
+            overflow = len(messages) - self.max_messages
+            if overflow > 0:
+                del messages[:overflow]
+                session["spilled"][channel] = session["spilled"].get(channel, 0) + overflow
+            self._resized(session_id)
+            return messages
+
+    def spilled_count(self, session_id, channel):
+        """Number of older messages of a channel that are no longer held in memory."""
+        with self.lock:
+            return self._session(session_id)["spilled"].get(channel, 0)
+
+    def all_messages(self, session_id, channel):
+        """Full history of a channel: spilled messages from disk plus the working set."""
+        with self.lock:
+            session = self._session(session_id)
+            if not session["spilled"].get(channel):
+                return list(session["messages"].get(channel, []))
+            return self._read_all(session_id, channel)
+
+    def load_state(self, session_id):
+        with self.lock:
+            return dict(self._session(session_id)["state"])
+
+    def save_state(self, session_id, state):
+        with self.lock:
+            self._session(session_id)["state"] = dict(state)
+            self._save_state(session_id, state)
+            self._resized(session_id)
+
+    def clear(self, session_id, channels=None):
+        """Forget a session's state and messages (all channels unless given), in memory and on disk."""
+        with self.lock:
+            session = self._session(session_id)
+            for channel, messages in session["messages"].items():
+                if channels is None or channel in channels:
+                    messages.clear()
+                    session["spilled"].pop(channel, None)
+            session["state"] = {}
+            self._delete(session_id, channels)
+            self._resized(session_id)
+
+    def memory_usage(self, session_id):
+        """Approximate bytes held in memory for a session (message text plus state JSON)."""
+        with self.lock:
+            session = self.sessions.get(session_id)
+            return self._size(session) if session else 0
+
+    def total_memory_usage(self):
+        """Approximate bytes held in memory by all sessions, as last measured."""
+        with self.lock:
+            return sum(self.sizes.values())
+
+
+class SQLiteSessionStore(SessionStore):
+    """Session store that writes every message and state change through to SQLite."""
+
+    def __init__(self, database_path=SESSION_DB, max_messages=MAX_MESSAGES_IN_MEMORY,
+                 max_sessions=MAX_SESSIONS_IN_MEMORY, idle_seconds=SESSION_IDLE_SECONDS,
+                 max_memory_mb=MAX_SESSION_MEMORY_MB):
+        super().__init__(max_messages, max_sessions, idle_seconds, max_memory_mb)
+        self.conn = sqlite3.connect(database_path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS SessionMessages (
+            MessageID INTEGER PRIMARY KEY,
+            SessionID VARCHAR(64),
+            Channel VARCHAR(50),
+            Role VARCHAR(20),
+            Content VARCHAR,
+            Created DATETIME)
+        ''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_session_messages ON SessionMessages (SessionID, Channel, MessageID)")
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS SessionState (
+            SessionID VARCHAR(64) PRIMARY KEY,
+            State VARCHAR,
+            Updated DATETIME)
+        ''')
+        self.conn.commit()
+
+    def _load(self, session_id):
+        session = super()._load(session_id)
+        for (channel,) in self.conn.execute(
+                "SELECT DISTINCT Channel FROM SessionMessages WHERE SessionID = ?", (session_id,)).fetchall():
+            rows = self.conn.execute('''
+            SELECT Role, Content FROM SessionMessages WHERE SessionID = ? AND Channel = ?
+            ORDER BY MessageID DESC LIMIT ?
+            ''', (session_id, channel, self.max_messages)).fetchall()
+            session["messages"][channel] = [{"role": role, "content": content} for role, content in reversed(rows)]
+            total = self.conn.execute("SELECT COUNT(*) FROM SessionMessages WHERE SessionID = ? AND Channel = ?",
+                                      (session_id, channel)).fetchone()[0]
+            session["spilled"][channel] = total - len(rows)
+
+        result = self.conn.execute("SELECT State FROM SessionState WHERE SessionID = ?", (session_id,)).fetchone()
+        if result:
+            session["state"] = json.loads(result[0])
+        return session
+
+    def _save_message(self, session_id, channel, message):
+        self.conn.execute(
+            "INSERT INTO SessionMessages (SessionID, Channel, Role, Content, Created) VALUES (?, ?, ?, ?, ?)",
+            (session_id, channel, message.get("role"), message.get("content"), datetime.now().isoformat()))
+        self.conn.commit()
+
+    def _save_state(self, session_id, state):
+        self.conn.execute("INSERT OR REPLACE INTO SessionState (SessionID, State, Updated) VALUES (?, ?, ?)",
+                          (session_id, json.dumps(state, default=str), datetime.now().isoformat()))
+        self.conn.commit()
+
+    def _delete(self, session_id, channels):
+        if channels is None:
+            self.conn.execute("DELETE FROM SessionMessages WHERE SessionID = ?", (session_id,))
+        for channel in channels or []:
+            self.conn.execute("DELETE FROM SessionMessages WHERE SessionID = ? AND Channel = ?", (session_id, channel))
+        self.conn.execute("DELETE FROM SessionState WHERE SessionID = ?", (session_id,))
+        self.conn.commit()
+
+    def _read_all(self, session_id, channel):
+        rows = self.conn.execute('''
+        SELECT Role, Content FROM SessionMessages WHERE SessionID = ? AND Channel = ? ORDER BY MessageID
+        ''', (session_id, channel)).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
@@ -0,0 +1,245 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import argparse
+import threading
+from collections.abc import Mapping
+
+import faiss
+from langchain_core.documents import Document
+from langchain_community.docstore.base import Docstore
+from langchain_community.vectorstores import FAISS
+
+from tracing import trace_stage
+from vector_index import INDEX_TYPES, set_search_params
+
+# A published index lives in <root>/<generation>/ (index.faiss + chunks.db);
+# <root>/CURRENT names the generation workers should use. index.json holds the
+# flags the index is opened with.
+SHARED_ROOT = "kb_shared"
+POINTER = "CURRENT"
+# How often workers look for a new generation
+CHECK_INTERVAL_SECONDS = 5
+# Generations kept on disk besides the current one (older readers may still use them)
+KEEP_GENERATIONS = 2
+# Created (O_CREAT | O_EXCL) by the one worker that builds the first generation
+BUILD_LOCK = "BUILDING"
+# A build lock older than this is taken to belong to a crashed worker
+BUILD_TIMEOUT_SECONDS = 1800
+
+
+def mmap_flags(index):
+    """read_index flags mapping an index's vectors instead of copying them.
+
+    IVF indexes map their inverted lists, the others (Flat, HNSW storage)
+    their flat codes; faiss rejects the two mmap flags combined on IVF.
+    """
+    if isinstance(index, faiss.IndexIVF):
+        return faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+    return getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+def publish(vector_store, root=SHARED_ROOT):
+    """Write a vector store as a new generation and atomically make it the current one."""
+    # Names sort by publication time, which prune relies on
+    generation = f"gen-{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 10**9:09d}"
+    staging = os.path.join(root, generation + ".tmp")
+    os.makedirs(staging)
+
+    with trace_stage("kb.publish", generation=generation) as span:
+        faiss.write_index(vector_store.index, os.path.join(staging, "index.faiss"))
+        with open(os.path.join(staging, "index.json"), "w", encoding="utf-8") as file:
+            json.dump({"read_flags": mmap_flags(vector_store.index)}, file)
+
+        conn = sqlite3.connect(os.path.join(staging, "chunks.db"))
+        conn.execute("CREATE TABLE Chunks (Position INTEGER PRIMARY KEY, Content VARCHAR, Metadata VARCHAR)")
+        conn.executemany("INSERT INTO Chunks VALUES (?, ?, ?)", (
+            (position, doc.page_content, json.dumps(doc.metadata, default=str))
+            for position, doc in ((position, vector_store.docstore.search(doc_id))
+                                  for position, doc_id in vector_store.index_to_docstore_id.items())))
+        conn.commit()
+        conn.close()
+        span["chunks"] = vector_store.index.ntotal
+
+        os.rename(staging, os.path.join(root, generation))
+        pointer_tmp = os.path.join(root, f"{POINTER}.{uuid.uuid4().hex}.tmp")
+        with open(pointer_tmp, "w", encoding="utf-8") as file:
+            file.write(generation)
+        os.replace(pointer_tmp, os.path.join(root, POINTER))
+
+    prune(root, generation)
+    return generation
+
+
+def prune(root, current, keep=KEEP_GENERATIONS):
+    generations = sorted(name for name in os.listdir(root)
+                         if name.startswith("gen-") and not name.endswith(".tmp") and name != current)
+    for name in generations[:max(0, len(generations) - keep)]:
+        folder = os.path.join(root, name)
+        try:
+            for file_name in os.listdir(folder):
+                os.remove(os.path.join(folder, file_name))
+            os.rmdir(folder)
+        except OSError as e:
+            # Still open by a worker on a platform that forbids deleting open files
+            print(f"Could not remove index generation {name}: {e}")
+
+
+class SQLiteDocstore(Docstore):
+    """Read-only chunk store; ids are the chunks' positions in the index."""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(f"file:{path}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+        self.conn.execute("PRAGMA mmap_size = 1073741824")
+        self.lock = threading.Lock()
+
+    def search(self, search):
+        with self.lock:
+            row = self.conn.execute("SELECT Content, Metadata FROM Chunks WHERE Position = ?", (int(search),)).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(id=str(search), page_content=row[0], metadata=json.loads(row[1]))
+
+
+class PositionIds(Mapping):
+    """index_to_docstore_id without holding one entry per chunk in memory."""
+
+    def __init__(self, size):
+        self.size = size
+
+    def __getitem__(self, position):
+        if not 0 <= position < self.size:
+            raise KeyError(position)
+        return str(position)
+
+    def __iter__(self):
+        return iter(range(self.size))
+
+    def __len__(self):
+        return self.size
+
+
+def open_generation(root, generation, embedding_model, params=None):
+    """LangChain FAISS store over a published generation, memory-mapped and read-only."""
+    folder = os.path.join(root, generation)
+    with open(os.path.join(folder, "index.json"), encoding="utf-8") as file:
+        flags = json.load(file)["read_flags"]
+    index = faiss.read_index(os.path.join(folder, "index.faiss"), flags)
+    set_search_params(index, params)
+    return FAISS(
+        embedding_function=embedding_model,
+        index=index,
+        docstore=SQLiteDocstore(os.path.join(folder, "chunks.db")),
+        index_to_docstore_id=PositionIds(index.ntotal),
+    )
+
+
+def current_generation(root=SHARED_ROOT):
+    try:
+        with open(os.path.join(root, POINTER), encoding="utf-8") as file:
+            return file.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def claim_build(root=SHARED_ROOT, timeout=BUILD_TIMEOUT_SECONDS):
+    """True if this process gets to build the first generation; the others should wait_for_generation."""
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, BUILD_LOCK)
+    for _ in range(2):
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(path) <= timeout:
+                    return False
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            continue
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            file.write(str(os.getpid()))
+        return True
+    return False
+
+
+def release_build(root=SHARED_ROOT):
+    try:
+        os.remove(os.path.join(root, BUILD_LOCK))
+    except FileNotFoundError:
+        pass
+
+
+def wait_for_generation(root=SHARED_ROOT, timeout=BUILD_TIMEOUT_SECONDS, poll_seconds=1.0):
+    """Wait while another worker builds the first generation.
+
+    Returns the published generation, or None if the builder gave up (its
+    lock is gone with nothing published) or the timeout passed.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        generation = current_generation(root)
+        if generation:
+            return generation
+        if not os.path.exists(os.path.join(root, BUILD_LOCK)):
+            return current_generation(root)
+        time.sleep(poll_seconds)
+    return None
+
+
+class SharedIndex:
+    """The current published generation, reopened when a new one is published.
+
+    Stands in for the vector store: attribute access (embeddings,
+    similarity_search_by_vector, ...) goes to the current generation. Every
+    worker process maps the same files, so the OS page cache holds one copy.
+    """
+
+    def __init__(self, embedding_model, root=SHARED_ROOT, params=None):
+        self.embedding_model = embedding_model
+        self.root = root
+        self.params = params
+        self.generation = None
+        self.vector_store = None
+        self.checked = 0.0
+        self.lock = threading.Lock()
+
+    def current(self, force=False):
+        """Vector store of the current generation (None if nothing has been published)."""
+        if not force and time.monotonic() - self.checked < CHECK_INTERVAL_SECONDS:
+            return self.vector_store
+        with self.lock:
+            self.checked = time.monotonic()
+            generation = current_generation(self.root)
+            if generation and generation != self.generation:
+                with trace_stage("kb.open_generation", generation=generation):
+                    self.vector_store = open_generation(self.root, generation, self.embedding_model, self.params)
+                self.generation = generation
+        return self.vector_store
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        vector_store = self.current()
+        if vector_store is None:
+            raise AttributeError(f"No knowledge base index published in {self.root}")
+        return getattr(vector_store, name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the knowledge base and publish it as a new shared index generation.")
+    parser.add_argument("documents", nargs="+", help="Word documents forming the corpus")
+    parser.add_argument("--root", default=SHARED_ROOT, help="Shared index folder (KB_SHARED_INDEX_DIR)")
+    parser.add_argument("--index", choices=INDEX_TYPES, default="Flat")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--model", default="all-mpnet-base-v2", help="HuggingFace embedding model")
+    args = parser.parse_args()
+
+    from ingest import ingest, huggingface_embeddings, print_progress
+    vector_store, stats = ingest(args.documents, huggingface_embeddings(args.model), args.index,
+                                 workers=args.workers, progress=print_progress)
+    generation = publish(vector_store, args.root)
+    print(f"Published {stats['chunks']} chunks as {generation}; running workers switch to it "
+          f"within {CHECK_INTERVAL_SECONDS}s")
@@ -0,0 +1,51 @@
+import os
+import sys
+import json
+import hashlib
+
+import numpy as np
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+
+class HashEmbeddings:
+    """Deterministic embeddings: identical texts get identical vectors."""
+
+    model_name = "hash"
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        return np.random.default_rng(seed).standard_normal(32).astype(np.float32).tolist()
+
+
+@pytest.fixture(autouse=True)
+def no_trace_file(monkeypatch):
+    import tracing
+    monkeypatch.setattr(tracing, "TRACE_PATH", "")
+
+
+@pytest.fixture
+def embeddings():
+    return HashEmbeddings()
+
+
+@pytest.fixture
+def example_payload():
+    """The example project JSON from Get_Json_prompt.txt."""
+    with open(os.path.join(REPO_ROOT, "Get_Json_prompt.txt"), encoding="utf-8") as file:
+        text = file.read()
+    return json.loads(text[text.index("{"):text.rindex("}") + 1])
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """A fresh my_DB.db in a temporary working directory."""
+    import Rag_to_DB
+    monkeypatch.chdir(tmp_path)
+    Rag_to_DB.create_database()
+    return str(tmp_path / "my_DB.db")
@@ -0,0 +1,98 @@
+import copy
+import time
+import sqlite3
+
+from db_writer import DBWriter
+from dedup import DuplicateIndex
+
+
+def wait_for(writer, job_id, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = writer.status(job_id)
+        if job["status"] in ("saved", "failed"):
+            return job
+        time.sleep(0.05)
+    raise TimeoutError(job_id)
+
+
+def test_rolled_back_payload_leaves_no_vectors_behind(database, embeddings, example_payload):
+    index = DuplicateIndex(embeddings)
+    writer = DBWriter(database)
+
+    # Fails after its requirements were inserted (no Constraints), so the payload is rolled back
+    broken = copy.deepcopy(example_payload)
+    del broken["Constraints"]
+    failed = wait_for(writer, writer.submit(broken, index))
+    assert failed["status"] == "failed"
+
+    # The next payload reuses the rolled-back ProjectID and must not merge into rows that no longer exist
+    saved = wait_for(writer, writer.submit(copy.deepcopy(example_payload), index))
+    assert saved["status"] == "saved"
+    assert saved["duplicates"] == 0
+
+    conn = sqlite3.connect(database)
+    requirements = conn.execute("SELECT COUNT(*) FROM Requirements").fetchone()[0]
+    conn.close()
+    assert requirements == len(example_payload["Requirements"])
+    assert all(RowID is not None for ids, _ in index.vectors.values() for RowID in ids)
+
+
+def test_duplicates_within_a_saved_payload_are_still_merged(database, embeddings, example_payload):
+    index = DuplicateIndex(embeddings)
+    writer = DBWriter(database)
+
+    payload = copy.deepcopy(example_payload)
+    payload["Requirements"].append(copy.deepcopy(payload["Requirements"][0]))
+    payload["Requirements"][-1]["Status"] = "Proposed"
+    job = wait_for(writer, writer.submit(payload, index))
+    assert job["status"] == "saved"
+    assert job["duplicates"] == 1
+
+
+def test_payload_reporting_an_error_is_rolled_back(database, embeddings, example_payload):
+    index = DuplicateIndex(embeddings)
+    writer = DBWriter(database)
+
+    # add_Requirements returns an error string for the second requirement instead of raising
+    broken = copy.deepcopy(example_payload)
+    broken["Requirements"][1]["Type"] = "Whatever"
+    failed = wait_for(writer, writer.submit(broken, index))
+    assert failed["status"] == "failed"
+
+    conn = sqlite3.connect(database)
+    counts = [conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+              for table in ("Clients", "Project", "ProjectTechnology", "Requirements", "RequirementSummary")]
+    conn.close()
+    assert counts == [0, 0, 0, 0, 0]
+    assert all(not ids for ids, _ in index.vectors.values())
+
+    saved = wait_for(writer, writer.submit(copy.deepcopy(example_payload), index))
+    assert saved["status"] == "saved"
+    conn = sqlite3.connect(database)
+    assert conn.execute("SELECT COUNT(*) FROM Project").fetchone()[0] == 1
+    conn.close()
+
+
+def test_loaded_projects_are_bounded(database, embeddings, example_payload):
+    index = DuplicateIndex(embeddings, max_loaded=1)
+    writer = DBWriter(database)
+    for _ in range(3):
+        assert wait_for(writer, writer.submit(copy.deepcopy(example_payload), index))["status"] == "saved"
+    assert len(index.vectors) == 1
+
+
+def test_duplicates_are_caught_across_saves_of_the_same_client(database, embeddings, example_payload):
+    index = DuplicateIndex(embeddings)
+    writer = DBWriter(database)
+    assert wait_for(writer, writer.submit(copy.deepcopy(example_payload), index))["status"] == "saved"
+
+    # A later save creates a new project for the same client
+    again = wait_for(writer, writer.submit(copy.deepcopy(example_payload), index))
+    assert again["status"] == "saved"
+    assert again["duplicates"] == len(example_payload["Requirements"]) + len(example_payload["Constraints"])
+
+    conn = sqlite3.connect(database)
+    assert conn.execute("SELECT COUNT(*) FROM Project").fetchone()[0] == 2
+    assert conn.execute("SELECT COUNT(*) FROM Requirements").fetchone()[0] == len(example_payload["Requirements"])
+    conn.close()
@@ -0,0 +1,62 @@
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import export
+
+
+def add_rows(database, requirements=(), technologies=()):
+    conn = sqlite3.connect(database)
+    conn.executemany("INSERT INTO Requirements (ProjectID, Description) VALUES (1, ?)", [(d,) for d in requirements])
+    for TechID in technologies:
+        conn.execute("INSERT INTO TechnologyStack (TechID, TechName) VALUES (?, ?)", (TechID, f"Tech {TechID}"))
+        conn.execute("INSERT INTO ProjectTechnology (ProjectID, TechID, Status) VALUES (1, ?, 'Existing')", (TechID,))
+    conn.commit()
+    conn.close()
+
+
+def read(export_dir, name):
+    return pd.read_parquet(os.path.join(export_dir, name))
+
+
+def test_watermark_is_saved_per_dataset(database, tmp_path, monkeypatch):
+    export_dir = str(tmp_path / "exports")
+    add_rows(database, ["first", "second"])
+    export.export_all(database, export_dir)
+
+    add_rows(database, ["third"])
+    export_dataset = export.export_dataset
+
+    def crash_on_constraints(conn, name, *args, **kwargs):
+        if name == "project_constraints":
+            raise RuntimeError("crash")
+        return export_dataset(conn, name, *args, **kwargs)
+
+    monkeypatch.setattr(export, "export_dataset", crash_on_constraints)
+    with pytest.raises(RuntimeError):
+        export.export_all(database, export_dir)
+    monkeypatch.setattr(export, "export_dataset", export_dataset)
+    export.export_all(database, export_dir)
+
+    assert sorted(read(export_dir, "project_requirements")["Description"]) == ["first", "second", "third"]
+
+
+def test_project_technology_is_rewritten_in_full(database, tmp_path):
+    export_dir = str(tmp_path / "exports")
+    add_rows(database, technologies=[1, 2])
+    export.export_all(database, export_dir)
+
+    conn = sqlite3.connect(database)
+    conn.execute("DELETE FROM ProjectTechnology WHERE TechID = 1")
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+    add_rows(database, technologies=[3])
+    summary = export.export_all(database, export_dir)
+
+    assert summary["project_technology"] == 2
+    assert sorted(read(export_dir, "project_technology")["TechName"]) == ["Tech 2", "Tech 3"]
+    assert len(os.listdir(os.path.join(export_dir, "project_technology"))) == 1
+    assert "project_technology" not in export.load_watermarks(export_dir)
@@ -0,0 +1,51 @@
+import threading
+
+import faiss
+import numpy as np
+import pytest
+
+from kb_namespaces import NamespaceStore, index_bytes
+from vector_index import build_faiss_index
+
+
+@pytest.mark.parametrize("index_type", ["Flat", "HNSW", "IVFPQ"])
+def test_index_bytes_is_close_to_serialized_size(index_type):
+    vectors = np.random.default_rng(0).standard_normal((2000, 32)).astype(np.float32)
+    index = build_faiss_index(vectors, index_type)
+    assert index_bytes(index) == pytest.approx(faiss.serialize_index(index).nbytes, rel=0.1)
+
+
+def namespace_store(tmp_path, embeddings, build):
+    for name in ("Banking", "Retail"):
+        (tmp_path / "knowledge_base" / name).mkdir(parents=True)
+        (tmp_path / "knowledge_base" / name / "doc.docx").write_bytes(b"")
+    store = NamespaceStore(embeddings, root=str(tmp_path / "knowledge_base"), index_root=str(tmp_path / "kb_indexes"))
+    store._load_or_build = build
+    store._estimate_bytes = lambda vector_store: 1
+    return store
+
+
+def test_slow_build_does_not_block_other_namespaces(tmp_path, embeddings):
+    release = threading.Event()
+    builds = []
+
+    def build(namespace, folder):
+        builds.append(namespace)
+        if namespace == "banking":
+            assert release.wait(10)
+        return f"store-{namespace}", "built"
+
+    store = namespace_store(tmp_path, embeddings, build)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(store.get("banking"))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+
+    # Served while banking is still building
+    assert store.get("retail") == "store-retail"
+    release.set()
+    for thread in threads:
+        thread.join(10)
+
+    assert results == ["store-banking"] * 3
+    assert builds.count("banking") == 1
@@ -0,0 +1,50 @@
+from pre_extract import LookupMatchers, pre_extract, drop_filled, merge_into
+
+MATCHERS = LookupMatchers(
+    ["Financial Services", "Retail"],
+    ["Email", "Teams Call"],
+    [("Salesforce", "CRM"), ("Power BI", "BI")],
+)
+
+DUMP = """From: jane.doe@acme.com
+We're a Financial Services firm. Call me on +44 1234 567890.
+We'd like to start on 1st September 2025 and go-live by 15/12/2025. Our budget is around £80k.
+About 150 internal users rely on Salesforce today."""
+
+
+def test_pre_extract_reads_unambiguous_fields():
+    found = pre_extract(DUMP, MATCHERS)
+    assert found["Clients"] == {"ContactEmail": "jane.doe@acme.com", "ContactNumber": "+44 1234 567890",
+                                "IndustryID": "Financial Services"}
+    assert found["Project"] == {"StartDate": "2025-09-01", "EndDate": "2025-12-15", "Budget": 80000, "NumUsers": 150}
+    assert found["ProjectTechnology"] == [{"TechName": "Salesforce", "Category": "CRM"}]
+
+
+def test_conflicting_values_are_left_out():
+    assert pre_extract("Contact a@x.com or b@y.com. Costs: $5,000 and $10,000.", MATCHERS) == {}
+
+
+def test_only_lines_naming_a_filled_field_are_dropped():
+    found = pre_extract(DUMP, MATCHERS)
+    missing = [
+        "ContactEmail",
+        "1. Clients.Contact Email:",
+        "Project.Budget",
+        "Industry",
+        "Location",
+        "Which industry regulations (e.g. PCI DSS) apply?",
+        "Can you confirm the contact email and the office location?",
+        "Is the budget fixed or flexible?",
+        "What are the main deadline risks?",
+    ]
+    assert drop_filled(missing, found) == missing[4:]
+
+
+def test_nothing_is_dropped_without_pre_extracted_values():
+    assert drop_filled(["ContactEmail", "Budget"], {}) == ["ContactEmail", "Budget"]
+
+
+def test_merge_keeps_llm_values():
+    merged = merge_into({"Clients": {"ContactEmail": None}, "Project": {"Budget": 90000}},
+                        {"Clients": {"ContactEmail": "a@x.com"}, "Project": {"Budget": 80000}})
+    assert merged == {"Clients": {"ContactEmail": "a@x.com"}, "Project": {"Budget": 90000}}
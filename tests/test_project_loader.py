@@ -0,0 +1,41 @@
+import copy
+import sqlite3
+
+import Rag_to_DB
+import project_loader
+from project_loader import load_project, load_projects
+
+
+def normalised(data):
+    """Interaction timestamps reduced to the date, which is all the database stores."""
+    data = copy.deepcopy(data)
+    for item in data["Requirements"] + data["Constraints"]:
+        item["InteractionID"]["Timestamp"] = item["InteractionID"]["Timestamp"][:10]
+        item.pop("ProjectID", None)
+    data["Project"].pop("ClientID", None)
+    return data
+
+
+def test_saved_project_round_trips(database, example_payload):
+    assert Rag_to_DB.main(copy.deepcopy(example_payload)) is True
+    assert normalised(load_project(1)) == normalised(example_payload)
+    assert load_project(2) is None
+
+
+def test_several_projects_take_five_queries(database, example_payload, monkeypatch):
+    for _ in range(3):
+        assert Rag_to_DB.main(copy.deepcopy(example_payload)) is True
+
+    statements = []
+    connect = sqlite3.connect
+
+    def traced_connect(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    monkeypatch.setattr(project_loader.sqlite3, "connect", traced_connect)
+    projects = load_projects([1, 2, 3, 4])
+
+    assert sorted(projects) == [1, 2, 3]
+    assert len([statement for statement in statements if statement.lstrip().upper().startswith("SELECT")]) == 5
@@ -0,0 +1,90 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import prompt_cache
+
+from prompt_cache import LocalPrefixCache, GeminiContextCache, create_prompt_cache, estimate_tokens
+
+PREFIX = "Static prompt template. " * 20
+
+
+class FakeLLM:
+    def __init__(self, fail_cached=False):
+        self.fail_cached = fail_cached
+        self.calls = []
+
+    def invoke(self, messages, **kwargs):
+        if kwargs.get("cached_content") and self.fail_cached:
+            raise ValueError("cached content not found")
+        self.calls.append((messages[0].content, kwargs))
+        return "response"
+
+
+def gemini_cache(name):
+    # Skips the SDK client; only the fallback paths are exercised
+    cache = GeminiContextCache.__new__(GeminiContextCache)
+    LocalPrefixCache.__init__(cache)
+    cache.caches = {}
+    cache.cache_name = lambda prefix: name
+    return cache
+
+
+def test_local_cache_reports_prefix_after_first_call():
+    cache, llm = LocalPrefixCache(), FakeLLM()
+    assert cache.invoke(llm, PREFIX, "a")[1] == 0
+    assert cache.invoke(llm, PREFIX, "b")[1] == estimate_tokens(PREFIX)
+
+
+@pytest.mark.parametrize("name, fail_cached", [(None, False), ("cachedContents/abc", True)])
+def test_gemini_fallback_reports_no_cached_tokens(name, fail_cached):
+    cache, llm = gemini_cache(name), FakeLLM(fail_cached)
+    for suffix in ("a", "b", "c"):
+        response, cached_tokens = cache.invoke(llm, PREFIX, suffix)
+        assert (response, cached_tokens) == ("response", 0)
+    assert [content for content, _ in llm.calls] == [PREFIX + "a", PREFIX + "b", PREFIX + "c"]
+
+
+class SlowCaches:
+    """Provider cache API whose create blocks for prefixes containing "slow"."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.created = []
+
+    def create(self, model, config):
+        text = config["contents"][0]
+        if "slow" in text:
+            assert self.release.wait(10)
+        self.created.append(text)
+        return SimpleNamespace(name=f"cachedContents/{len(self.created)}")
+
+
+def test_cache_creation_does_not_block_other_prefixes(monkeypatch):
+    fake_types = SimpleNamespace(
+        CreateCachedContentConfig=lambda contents, **kwargs: {"contents": contents},
+        Content=lambda role, parts: parts[0], Part=lambda text: text)
+    monkeypatch.setattr(prompt_cache, "types", fake_types, raising=False)
+    cache = GeminiContextCache.__new__(GeminiContextCache)
+    LocalPrefixCache.__init__(cache)
+    cache.caches, cache.creating, cache.model = {}, {}, "model"
+    cache.client = SimpleNamespace(caches=SlowCaches())
+
+    names = []
+    threads = [threading.Thread(target=lambda: names.append(cache.cache_name("slow prefix"))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    assert cache.cache_name("fast prefix") == "cachedContents/1"
+    cache.client.caches.release.set()
+    for thread in threads:
+        thread.join(10)
+
+    # Waiting calls for the same prefix reuse the one cache that was created
+    assert names == ["cachedContents/2"] * 3
+    assert cache.client.caches.created == ["fast prefix", "slow prefix"]
+
+
+def test_production_fallback_reports_no_cached_tokens():
+    cache, llm = create_prompt_cache(None, None), FakeLLM()
+    assert [cache.invoke(llm, PREFIX, suffix)[1] for suffix in ("a", "b")] == [0, 0]
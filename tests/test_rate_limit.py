@@ -0,0 +1,65 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from rate_limit import RateLimiter, StubLLM, INTERACTIVE, BACKGROUND
+
+# Quotas are per one-second period so the tests run in seconds instead of minutes
+PERIOD = 1
+
+
+def test_no_quota_errors_at_the_ceiling():
+    stub = StubLLM(20, latency=0, period=PERIOD)
+    limiter = RateLimiter(requests_per_minute=20, max_concurrent=8, base_delay=0.01, max_delay=0.1, period=PERIOD)
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda n: limiter.call(lambda: stub.invoke(n), tokens=1), range(40)))
+
+    assert results == list(range(40))
+    assert stub.rejected == 0
+    assert limiter.stats["retries"] == 0
+
+
+def test_interactive_calls_run_before_background():
+    limiter = RateLimiter(requests_per_minute=10000, max_concurrent=1)
+    order = []
+    # Hold the only slot so every call below has to queue
+    limiter.acquire(1)
+
+    def start(label, priority):
+        thread = threading.Thread(target=limiter.call, args=(lambda: order.append(label), 1, priority))
+        thread.start()
+        time.sleep(0.05)
+        return thread
+
+    threads = [start("background", BACKGROUND) for _ in range(3)] + [start("interactive", INTERACTIVE) for _ in range(3)]
+    limiter.release(1)
+    for thread in threads:
+        thread.join(10)
+
+    assert order == ["interactive"] * 3 + ["background"] * 3
+
+
+def test_only_retryable_errors_are_retried():
+    limiter = RateLimiter(requests_per_minute=10000, base_delay=0.01, max_delay=0.05)
+    attempts = []
+
+    def flaky():
+        attempts.append("quota")
+        if len(attempts) < 3:
+            raise StubLLM.QuotaError("429 RESOURCE_EXHAUSTED: quota exceeded")
+        return "ok"
+
+    assert limiter.call(flaky, tokens=1) == "ok"
+    assert limiter.stats["retries"] == 2
+
+    def broken():
+        attempts.append("invalid")
+        raise ValueError("invalid argument")
+
+    with pytest.raises(ValueError):
+        limiter.call(broken, tokens=1)
+    assert attempts.count("invalid") == 1
+    assert limiter.stats["retries"] == 2
+    assert limiter.stats["failures"] == 1
@@ -0,0 +1,42 @@
+from session_store import SQLiteSessionStore
+
+
+def store(tmp_path, **limits):
+    return SQLiteSessionStore(str(tmp_path / "sessions.db"), max_messages=5, **limits)
+
+
+def test_least_recently_used_sessions_are_evicted_and_reloaded(tmp_path):
+    sessions = store(tmp_path, max_sessions=2)
+    for session_id in ("a", "b", "c"):
+        sessions.append_message(session_id, "messages", {"role": "user", "content": f"hello {session_id}"})
+        sessions.save_state(session_id, {"step": session_id})
+    assert list(sessions.sessions) == ["b", "c"]
+
+    assert sessions.recent_messages("a", "messages") == [{"role": "user", "content": "hello a"}]
+    assert sessions.load_state("a") == {"step": "a"}
+    assert list(sessions.sessions) == ["c", "a"]
+
+
+def test_idle_sessions_are_evicted(tmp_path, monkeypatch):
+    import session_store
+    now = [1000.0]
+    monkeypatch.setattr(session_store.time, "monotonic", lambda: now[0])
+    sessions = store(tmp_path, idle_seconds=60)
+    sessions.save_state("idle", {"step": 1})
+    now[0] += 61
+    sessions.save_state("active", {"step": 2})
+    assert list(sessions.sessions) == ["active"]
+    assert sessions.load_state("idle") == {"step": 1}
+
+
+def test_memory_cap_applies_across_sessions(tmp_path):
+    sessions = store(tmp_path, max_memory_mb=1)
+    text = "x" * 300000
+    for session_id in ("a", "b", "c", "d", "e"):
+        sessions.append_message(session_id, "messages", {"role": "user", "content": text})
+    assert sessions.total_memory_usage() <= 1024 * 1024
+    assert list(sessions.sessions) == ["c", "d", "e"]
+    # The session being used is kept even if it alone exceeds the cap
+    sessions.append_message("a", "messages", {"role": "user", "content": "y" * 2000000})
+    assert list(sessions.sessions) == ["a"]
+    assert len(sessions.all_messages("a", "messages")) == 2
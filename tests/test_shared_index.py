@@ -0,0 +1,69 @@
+import threading
+
+import faiss
+import pytest
+from langchain_core.documents import Document
+
+from shared_index import (SharedIndex, publish, open_generation, current_generation, claim_build, release_build,
+                          wait_for_generation)
+from vector_index import build_vector_store
+
+EXPECTED_INDEX = {"Flat": faiss.IndexFlat, "HNSW": faiss.IndexHNSW, "IVFPQ": faiss.IndexIVFPQ}
+
+
+@pytest.mark.parametrize("index_type", ["Flat", "HNSW", "IVFPQ"])
+def test_publish_and_open_round_trip(tmp_path, embeddings, index_type):
+    # Enough chunks for IVF-PQ to train instead of falling back to Flat
+    splits = [Document(page_content=f"chunk {number}", metadata={"number": number}) for number in range(2000)]
+    vector_store = build_vector_store(splits, embeddings, index_type)
+    assert isinstance(vector_store.index, EXPECTED_INDEX[index_type])
+
+    root = str(tmp_path / "kb_shared")
+    generation = publish(vector_store, root)
+    assert current_generation(root) == generation
+
+    shared = open_generation(root, generation, embeddings, {"nprobe": 64})
+    assert isinstance(shared.index, EXPECTED_INDEX[index_type])
+    assert shared.index.ntotal == len(splits)
+
+    query = embeddings.embed_query("chunk 7")
+    expected = vector_store.similarity_search_by_vector(query, k=1)[0]
+    found = shared.similarity_search_by_vector(query, k=1)[0]
+    assert (found.id, found.page_content, found.metadata) == (expected.id, expected.page_content, expected.metadata)
+
+
+def test_workers_switch_to_a_new_generation(tmp_path, embeddings):
+    root = str(tmp_path / "kb_shared")
+    publish(build_vector_store([Document(page_content="old")], embeddings), root)
+    shared = SharedIndex(embeddings, root)
+    assert shared.similarity_search_by_vector(embeddings.embed_query("old"), k=1)[0].page_content == "old"
+
+    publish(build_vector_store([Document(page_content="new")], embeddings), root)
+    shared.current(force=True)
+    assert shared.similarity_search_by_vector(embeddings.embed_query("new"), k=1)[0].page_content == "new"
+
+
+def test_only_one_worker_builds_the_first_generation(tmp_path, embeddings):
+    root = str(tmp_path / "shared")
+    assert claim_build(root)
+    assert not claim_build(root)
+
+    waited = []
+    waiter = threading.Thread(target=lambda: waited.append(wait_for_generation(root, timeout=10, poll_seconds=0.01)))
+    waiter.start()
+    generation = publish(build_vector_store([Document(page_content=f"chunk {number}") for number in range(20)], embeddings, "Flat"), root)
+    release_build(root)
+    waiter.join(10)
+
+    assert waited == [generation]
+    # A builder that gives up without publishing releases the waiters
+    other = str(tmp_path / "other")
+    assert claim_build(other)
+    release_build(other)
+    assert wait_for_generation(other, timeout=10, poll_seconds=0.01) is None
+
+
+def test_stale_build_lock_is_taken_over(tmp_path):
+    root = str(tmp_path / "shared")
+    assert claim_build(root)
+    assert claim_build(root, timeout=-1)
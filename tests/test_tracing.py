@@ -0,0 +1,65 @@
+import os
+import sqlite3
+from collections import deque
+
+import tracing
+from tracing import traced
+
+
+def test_nested_traced_rows_are_counted_once():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE Rows (Value INTEGER)")
+    counter = lambda: conn.total_changes
+
+    @traced("test.leaf", rows=counter)
+    def leaf():
+        conn.execute("INSERT INTO Rows VALUES (1)")
+
+    @traced("test.parent", rows=counter)
+    def parent():
+        conn.executemany("INSERT INTO Rows VALUES (?)", [(2,), (3,)])
+        leaf()
+        leaf()
+
+    parent()
+    spans = {span["stage"]: span["rows"] for span in tracing.recent_spans(3)}
+    assert spans == {"test.leaf": 1, "test.parent": 2}
+    assert sum(span["rows"] for span in tracing.recent_spans(3)) == conn.total_changes == 4
+
+
+def test_helpers_report_their_own_inserted_rows(database, example_payload, monkeypatch):
+    import Rag_to_DB
+    monkeypatch.setattr(tracing, "_recent", deque(maxlen=500))
+    tables = {"db.add_requirements": ("Requirements", "RequirementCategories"),
+              "db.add_constraints": ("Constraints", "ConstraintType"),
+              "db.add_interaction_log": ("InteractionLog", "SourceType")}
+    conn = sqlite3.connect(database)
+
+    def counts():
+        return {stage: sum(conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in names)
+                for stage, names in tables.items()}
+
+    before = counts()
+    assert Rag_to_DB.main(example_payload) is True
+    after = counts()
+    conn.close()
+
+    rows = dict.fromkeys(tables, 0)
+    for span in tracing.recent_spans(500):
+        if span["stage"] in rows:
+            rows[span["stage"]] += span["rows"]
+    # Trigger-maintained FTS rows, embeddings and transcripts are not counted
+    assert rows == {stage: after[stage] - before[stage] for stage in tables}
+
+
+def test_trace_file_rolls_over(tmp_path, monkeypatch):
+    path = str(tmp_path / "traces.jsonl")
+    monkeypatch.setattr(tracing, "TRACE_PATH", path)
+    monkeypatch.setattr(tracing, "TRACE_MAX_BYTES", 1000)
+    monkeypatch.setattr(tracing, "TRACE_BACKUPS", 2)
+    for _ in range(200):
+        with tracing.trace_stage("test.rollover", padding="x" * 50):
+            pass
+    files = sorted(os.listdir(tmp_path))
+    assert files == ["traces.jsonl", "traces.jsonl.1", "traces.jsonl.2"]
+    assert all(os.path.getsize(tmp_path / name) < 1000 + 200 for name in files)
@@ -0,0 +1,194 @@
+import os
+import json
+import time
+import threading
+from collections import deque, defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Where the JSONL traces are appended (set to "" to keep traces in memory only)
+TRACE_PATH = os.environ.get("TRACKBOT_TRACE_PATH", "traces.jsonl")
+# The trace file rolls over to <path>.1 ... <path>.<TRACE_BACKUPS> once it reaches this size
+TRACE_MAX_BYTES = int(float(os.environ.get("TRACKBOT_TRACE_MAX_MB", 50)) * 1024 * 1024)
+TRACE_BACKUPS = int(os.environ.get("TRACKBOT_TRACE_BACKUPS", 3))
+
+_lock = threading.Lock()
+_recent = deque(maxlen=500)
+_totals = defaultdict(lambda: {"count": 0, "seconds": 0.0, "errors": 0,
+                               "prompt_tokens": 0, "cached_tokens": 0, "response_tokens": 0, "rows": 0})
+
+
+def _roll_over():
+    """Rotate the trace file once it is over TRACE_MAX_BYTES, dropping the oldest backup."""
+    if not os.path.exists(TRACE_PATH) or os.path.getsize(TRACE_PATH) < TRACE_MAX_BYTES:
+        return
+    if TRACE_BACKUPS < 1:
+        os.remove(TRACE_PATH)
+        return
+    for number in range(TRACE_BACKUPS - 1, 0, -1):
+        if os.path.exists(f"{TRACE_PATH}.{number}"):
+            os.replace(f"{TRACE_PATH}.{number}", f"{TRACE_PATH}.{number + 1}")
+    os.replace(TRACE_PATH, f"{TRACE_PATH}.1")
+
+
+def record(span):
+    """Store a finished span in memory and append it to the JSONL trace file."""
+    with _lock:
+        _recent.append(span)
+        totals = _totals[span["stage"]]
+        totals["count"] += 1
+        totals["seconds"] += span.get("seconds", 0.0)
+        totals["errors"] += 1 if span.get("error") else 0
+        totals["prompt_tokens"] += span.get("prompt_tokens") or 0
+        totals["cached_tokens"] += span.get("cached_tokens") or 0
+        totals["response_tokens"] += span.get("response_tokens") or 0
+        totals["rows"] += span.get("rows") or 0
+
+        if TRACE_PATH:
+            try:
+                _roll_over()
+                with open(TRACE_PATH, "a", encoding="utf-8") as file:
+                    file.write(json.dumps(span, default=str) + "\n")
+            except OSError as e:
+                print(f"Could not write trace: {e}")
+
+
+@contextmanager
+def trace_stage(stage, **attrs):
+    """Time a block of code; the yielded dict can be filled with extra fields."""
+    span = {"stage": stage, "ts": datetime.now().isoformat(timespec="milliseconds"), **attrs}
+    start = time.perf_counter()
+    try:
+        yield span
+    except Exception as e:
+        span["error"] = str(e)
+        raise
+    finally:
+        span["seconds"] = round(time.perf_counter() - start, 6)
+        record(span)
+
+
+# Per thread, the rows counted by traced calls nested in each open traced call
+_nested_rows = threading.local()
+
+
+def traced(stage, rows=None):
+    """Decorator version of trace_stage.
+
+    rows is an optional callable returning a running change counter
+    (e.g. conn.total_changes); the difference is stored as the row count.
+    Rows already counted by traced calls nested inside (e.g. add_Interaction_Log
+    called from add_Requirements) are left out, so each row is counted once.
+    Helpers that report errors by returning a string are flagged as errors.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not rows:
+                with trace_stage(stage) as span:
+                    result = func(*args, **kwargs)
+                    if isinstance(result, str):
+                        span["error"] = result
+                    return result
+
+            stack = _nested_rows.__dict__.setdefault("stack", [])
+            with trace_stage(stage) as span:
+                before = rows()
+                stack.append(0)
+                try:
+                    result = func(*args, **kwargs)
+                finally:
+                    changed = rows() - before
+                    span["rows"] = changed - stack.pop()
+                    if stack:
+                        stack[-1] += changed
+                if isinstance(result, str):
+                    span["error"] = result
+                return result
+        return wrapper
+    return decorator
+
+
+def token_usage(response):
+    """Return (prompt_tokens, response_tokens) reported by an LLM response."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    return usage.get("input_tokens"), usage.get("output_tokens")
+
+
+def recent_spans(limit=50):
+    with _lock:
+        return list(_recent)[-limit:]
+
+
+def latency_summary():
+    """Per-stage count, last, p50 and p95 latency (seconds) over recent spans."""
+    by_stage = defaultdict(list)
+    for span in recent_spans(limit=_recent.maxlen):
+        by_stage[span["stage"]].append(span["seconds"])
+
+    summary = {}
+    for stage, samples in by_stage.items():
+        ordered = sorted(samples)
+        summary[stage] = {
+            "count": len(samples),
+            "last": samples[-1],
+            "p50": ordered[len(ordered) // 2],
+            "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        }
+    return summary
+
+
+def prometheus_text():
+    """Render the running totals in the Prometheus text exposition format."""
+    with _lock:
+        totals = {stage: dict(values) for stage, values in _totals.items()}
+
+    lines = [
+        "# HELP trackbot_stage_seconds Wall time spent per pipeline stage.",
+        "# TYPE trackbot_stage_seconds summary",
+    ]
+    for stage, values in totals.items():
+        lines.append(f'trackbot_stage_seconds_sum{{stage="{stage}"}} {values["seconds"]}')
+        lines.append(f'trackbot_stage_seconds_count{{stage="{stage}"}} {values["count"]}')
+    lines += ["# HELP trackbot_stage_errors_total Failed stage executions.",
+              "# TYPE trackbot_stage_errors_total counter"]
+    for stage, values in totals.items():
+        lines.append(f'trackbot_stage_errors_total{{stage="{stage}"}} {values["errors"]}')
+    lines += ["# HELP trackbot_tokens_total LLM tokens per stage.",
+              "# TYPE trackbot_tokens_total counter"]
+    for stage, values in totals.items():
+        if values["prompt_tokens"] or values["response_tokens"]:
+            lines.append(f'trackbot_tokens_total{{stage="{stage}",kind="prompt"}} {values["prompt_tokens"]}')
+            lines.append(f'trackbot_tokens_total{{stage="{stage}",kind="response"}} {values["response_tokens"]}')
+            lines.append(f'trackbot_tokens_total{{stage="{stage}",kind="cached"}} {values["cached_tokens"]}')
+    lines += ["# HELP trackbot_rows_written_total Database rows changed per stage.",
+              "# TYPE trackbot_rows_written_total counter"]
+    for stage, values in totals.items():
+        if values["rows"]:
+            lines.append(f'trackbot_rows_written_total{{stage="{stage}"}} {values["rows"]}')
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """Serve /metrics on a local port from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
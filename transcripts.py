@@ -0,0 +1,111 @@
+import zlib
+import sqlite3
+import hashlib
+from collections import OrderedDict
+
+# Raw transcripts are stored once, zlib-compressed and addressed by the SHA-256
+# of their text. InteractionLog.RawTextHash points at the blob; the legacy
+# InteractionLog.RawText column is left NULL.
+COMPRESSION_LEVEL = 9
+CACHE_SIZE = 64
+
+_cache = OrderedDict()
+
+
+def create_transcript_store(cursor):
+    """Create TranscriptBlob and add InteractionLog.RawTextHash on older databases."""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS TranscriptBlob (
+        Hash CHAR(64) PRIMARY KEY,
+        Codec VARCHAR(10),
+        Size INTEGER,
+        Data BLOB)
+    ''')
+
+    cursor.execute("PRAGMA table_info(InteractionLog)")
+    columns = [column[1] for column in cursor.fetchall()]
+    if "RawTextHash" not in columns:
+        cursor.execute("ALTER TABLE InteractionLog ADD COLUMN RawTextHash CHAR(64) REFERENCES TranscriptBlob(Hash)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_interaction_hash ON InteractionLog (RawTextHash)")
+
+
+def transcript_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def store_transcript(cursor, text):
+    """Store a transcript (once) and return its hash."""
+    if text is None:
+        return None
+    RawTextHash = transcript_hash(text)
+    data = text.encode("utf-8")
+    cursor.execute("INSERT OR IGNORE INTO TranscriptBlob (Hash, Codec, Size, Data) VALUES (?, ?, ?, ?)",
+                   (RawTextHash, "zlib", len(data), zlib.compress(data, COMPRESSION_LEVEL)))
+    return RawTextHash
+
+
+def decompress(codec, data):
+    if codec != "zlib":
+        raise ValueError(f"Unknown transcript codec: {codec}")
+    return zlib.decompress(data).decode("utf-8")
+
+
+def load_transcript(cursor, RawTextHash):
+    """Decompress a transcript by hash, keeping a small LRU of recent texts."""
+    if RawTextHash is None:
+        return None
+    if RawTextHash in _cache:
+        _cache.move_to_end(RawTextHash)
+        return _cache[RawTextHash]
+
+    cursor.execute("SELECT Codec, Data FROM TranscriptBlob WHERE Hash = ?", (RawTextHash,))
+    result = cursor.fetchone()
+    if not result:
+        return None
+    text = decompress(*result)
+
+    _cache[RawTextHash] = text
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return text
+
+
+def interaction_raw_text(cursor, InteractionID):
+    """Raw transcript of an interaction, from the blob store or a not yet migrated row."""
+    cursor.execute("SELECT RawTextHash, RawText FROM InteractionLog WHERE InteractionID = ?", (InteractionID,))
+    result = cursor.fetchone()
+    if not result:
+        return None
+    RawTextHash, RawText = result
+    return load_transcript(cursor, RawTextHash) if RawTextHash else RawText
+
+
+def migrate_transcripts(database_path='my_DB.db'):
+    """Move inline InteractionLog.RawText values into TranscriptBlob and shrink the file."""
+    conn = sqlite3.connect(database_path)
+    cursor = conn.cursor()
+    create_transcript_store(cursor)
+
+    rows = cursor.execute(
+        "SELECT InteractionID, RawText FROM InteractionLog WHERE RawText IS NOT NULL AND RawTextHash IS NULL").fetchall()
+    for InteractionID, RawText in rows:
+        RawTextHash = store_transcript(cursor, RawText)
+        cursor.execute("UPDATE InteractionLog SET RawTextHash = ?, RawText = NULL WHERE InteractionID = ?",
+                       (RawTextHash, InteractionID))
+    conn.commit()
+
+    if rows:
+        conn.execute("VACUUM")
+    conn.close()
+    return len(rows)
+
+
+def ensure_transcript_store(database_path='my_DB.db'):
+    """Migrate an existing database to the compressed transcript store if needed."""
+    conn = sqlite3.connect(database_path)
+    columns = [column[1] for column in conn.execute("PRAGMA table_info(InteractionLog)")]
+    pending = "RawTextHash" not in columns or conn.execute(
+        "SELECT 1 FROM InteractionLog WHERE RawText IS NOT NULL AND RawTextHash IS NULL LIMIT 1").fetchone()
+    conn.close()
+    if pending:
+        migrate_transcripts(database_path)
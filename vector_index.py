@@ -0,0 +1,179 @@
+import time
+import random
+import argparse
+import numpy as np
+import faiss
+from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
+
+# Index types the knowledge base can be built with
+INDEX_TYPES = ("Flat", "HNSW", "IVFPQ")
+
+# Build and search parameters; search-time ones can be changed after loading
+DEFAULT_PARAMS = {
+    "hnsw_m": 32,             # HNSW graph degree
+    "ef_construction": 200,   # HNSW build-time candidate list
+    "ef_search": 64,          # HNSW search-time candidate list
+    "nlist": None,            # IVF cells (default: about 4 * sqrt(N))
+    "pq_m": 16,               # PQ sub-quantizers (must divide the embedding dimension)
+    "pq_bits": 8,             # bits per PQ code
+    "nprobe": 16,             # IVF cells visited per query
+    "train_sample": 100000,   # vectors used to train IVF-PQ
+}
+
+
+def resolve_params(params=None):
+    resolved = dict(DEFAULT_PARAMS)
+    resolved.update({key: value for key, value in (params or {}).items() if value is not None})
+    return resolved
+
+
+def build_faiss_index(vectors, index_type="Flat", params=None):
+    """Build (and train, if needed) a FAISS index over float32 vectors using L2 distance.
+
+    Corpora too small to train IVF-PQ fall back to a Flat index.
+    """
+    params = resolve_params(params)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    count, dimension = vectors.shape
+
+    if index_type == "Flat":
+        index = faiss.IndexFlatL2(dimension)
+
+    elif index_type == "HNSW":
+        index = faiss.IndexHNSWFlat(dimension, params["hnsw_m"])
+        index.hnsw.efConstruction = params["ef_construction"]
+
+    elif index_type == "IVFPQ":
+        # k-means wants ~39 training points per cell and PQ needs 2^bits points per codebook
+        nlist = params["nlist"] or max(1, min(int(4 * np.sqrt(count)), count // 39))
+        if count < max(nlist, 2 ** params["pq_bits"]) or dimension % params["pq_m"]:
+            print(f"Not enough vectors ({count}) to train IVF-PQ, using a Flat index instead.")
+            return build_faiss_index(vectors, "Flat", params)
+        quantizer = faiss.IndexFlatL2(dimension)
+        index = faiss.IndexIVFPQ(quantizer, dimension, nlist, params["pq_m"], params["pq_bits"])
+        sample_size = min(count, params["train_sample"])
+        sample = vectors[np.random.default_rng(0).choice(count, sample_size, replace=False)]
+        index.train(sample)
+
+    else:
+        raise ValueError(f"Unknown index type: {index_type}. Use one of {', '.join(INDEX_TYPES)}")
+
+    set_search_params(index, params)
+    index.add(vectors)
+    return index
+
+
+def set_search_params(index, params):
+    """Apply efSearch / nprobe to an HNSW or IVF index (no-op for Flat)."""
+    params = resolve_params(params)
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = params["ef_search"]
+    elif isinstance(index, faiss.IndexIVF):
+        index.nprobe = params["nprobe"]
+
+
+def build_vector_store(splits, embedding_model, index_type="Flat", params=None, vectors=None):
+    """LangChain FAISS store over document splits, backed by the selected index type.
+
+    vectors can hold the splits' embeddings if they were already computed.
+    """
+    if vectors is None:
+        vectors = embedding_model.embed_documents([split.page_content for split in splits])
+    index = build_faiss_index(vectors, index_type, params)
+
+    ids = [str(position) for position in range(len(splits))]
+    for split, doc_id in zip(splits, ids):
+        split.id = doc_id
+    return FAISS(
+        embedding_function=embedding_model,
+        index=index,
+        docstore=InMemoryDocstore(dict(zip(ids, splits))),
+        index_to_docstore_id=dict(enumerate(ids)),
+    )
+
+
+def load_splits(paths, chunk_size=1000, chunk_overlap=200):
+    """Load Word documents and split them the same way the app does."""
+    from langchain_community.document_loaders import UnstructuredWordDocumentLoader
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    docs = []
+    for path in paths:
+        docs.extend(UnstructuredWordDocumentLoader(path).load())
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return text_splitter.split_documents(docs)
+
+
+def evaluate(vectors, queries, index_type, params_grid, k=10):
+    """Recall@k against an exact Flat index and per-query latency for each parameter set."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    queries = np.asarray(queries, dtype=np.float32)
+
+    exact = build_faiss_index(vectors, "Flat")
+    _, truth = exact.search(queries, k)
+
+    start = time.perf_counter()
+    index = build_faiss_index(vectors, index_type, params_grid[0])
+    build_seconds = time.perf_counter() - start
+
+    results = []
+    for params in params_grid:
+        set_search_params(index, params)
+        latencies = []
+        found = np.empty_like(truth)
+        for position, query in enumerate(queries):
+            start = time.perf_counter()
+            _, neighbours = index.search(query[None, :], k)
+            latencies.append(time.perf_counter() - start)
+            found[position] = neighbours[0]
+        recall = np.mean([len(set(found[i]) & set(truth[i])) / k for i in range(len(queries))])
+        results.append({
+            "params": params,
+            "recall": float(recall),
+            "mean_ms": 1000 * float(np.mean(latencies)),
+            "p95_ms": 1000 * float(np.percentile(latencies, 95)),
+        })
+    return build_seconds, results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare a FAISS index type against exact Flat search on the knowledge base.")
+    parser.add_argument("documents", nargs="+", help="Word documents forming the corpus")
+    parser.add_argument("--index", choices=INDEX_TYPES, default="HNSW")
+    parser.add_argument("--queries-file", help="One query per line (default: a sample of the corpus chunks)")
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ef-search", type=int, nargs="*", default=[16, 32, 64, 128, 256])
+    parser.add_argument("--nprobe", type=int, nargs="*", default=[1, 4, 16, 64])
+    parser.add_argument("--hnsw-m", type=int, help="HNSW graph degree")
+    parser.add_argument("--nlist", type=int, help="IVF cells")
+    parser.add_argument("--pq-m", type=int, help="PQ sub-quantizers")
+    parser.add_argument("--model", default="all-mpnet-base-v2", help="HuggingFace embedding model")
+    args = parser.parse_args()
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+    embedding_model = HuggingFaceEmbeddings(model_name=args.model)
+
+    splits = load_splits(args.documents)
+    texts = [split.page_content for split in splits]
+    vectors = embedding_model.embed_documents(texts)
+    if args.queries_file:
+        with open(args.queries_file, encoding="utf-8") as file:
+            queries = embedding_model.embed_documents([line.strip() for line in file if line.strip()])
+    else:
+        queries = [vectors[i] for i in random.Random(0).sample(range(len(vectors)), min(args.num_queries, len(vectors)))]
+
+    build_params = {"hnsw_m": args.hnsw_m, "nlist": args.nlist, "pq_m": args.pq_m}
+    if args.index == "HNSW":
+        grid = [{**build_params, "ef_search": value} for value in args.ef_search]
+    elif args.index == "IVFPQ":
+        grid = [{**build_params, "nprobe": value} for value in args.nprobe]
+    else:
+        grid = [build_params]
+
+    build_seconds, results = evaluate(vectors, queries, args.index, grid, args.k)
+    print(f"{len(vectors)} chunks, {len(queries)} queries, {args.index} built in {build_seconds:.2f}s")
+    for result in results:
+        print(f"{result['params']}: recall@{args.k}={result['recall']:.3f} "
+              f"mean={result['mean_ms']:.3f}ms p95={result['p95_ms']:.3f}ms")